@@ -1,4 +1,22 @@
-from .cli import app
+"""Console entry point.
+
+``mensa status`` is dispatched before the Typer app is imported so that a
+cached status line is printed without loading the CLI stack.
+"""
+
+import sys
+
+
+def main() -> None:
+    if sys.argv[1:2] == ["status"]:
+        from .status import main as status_main
+
+        sys.exit(status_main(sys.argv[2:]))
+
+    from .cli import app
 
-if __name__ == "__main__":
     app()
+
+
+if __name__ == "__main__":
+    main()
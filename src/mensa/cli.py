@@ -2,7 +2,15 @@
 
 from __future__ import annotations
 
+import contextlib
+import datetime
+import heapq
+import itertools
 import logging
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
 import typer
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
@@ -15,8 +23,10 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 #     sys.path.insert(0, str(package_dir.parent))
 #     globals()["__package__"] = package_dir.name
 
-from . import http, presentation
-from .providers import SITES
+from . import jobs, paths, presentation, ratelimit, scraper, similarity
+from .query import Query, QueryError, compile_query, tier_price
+from .stats import MealStats, RollupStore
+from .providers import CATALOG, SITES
 from .providers.types import MensaSite
 
 logger = logging.getLogger(__name__)
@@ -24,6 +34,30 @@ logger = logging.getLogger(__name__)
 app = typer.Typer(help="Scrape Mensa menus from supported providers.")
 console = Console()
 
+jobs_app = typer.Typer(help="Distribute scrape jobs over worker processes.")
+app.add_typer(jobs_app, name="jobs")
+
+dishes_app = typer.Typer(help="Find recurring dishes across days and Mensas.")
+app.add_typer(dishes_app, name="dishes")
+
+
+def _default_queue() -> str:
+    return str(paths.cache_dir("jobs") / "queue.sqlite")
+
+
+def _open_queue(url: Optional[str]) -> jobs.JobQueue:
+    url = url or _default_queue()
+    if url.partition(":")[0] == "memory":
+        raise typer.BadParameter(
+            "memory: queues do not outlive a single command; use a SQLite path",
+            param_hint="--queue",
+        )
+    return jobs.open_queue(url)
+
+
+def _default_sink() -> str:
+    return str(paths.cache_dir("jobs") / "results.jsonl")
+
 
 def _validate_price_tier(value: str) -> str:
     allowed = {"student", "employee", "guest"}
@@ -95,22 +129,20 @@ def scrape(
         console=console,
     ) as progress:
         task = progress.add_task("Fetching menu...", total=None)
-        html = http.fetch_html(site.url)
+        parse_result = scraper.fetch_site(site)
         progress.update(task, description="Menu fetched successfully!")
 
-    console.print("[blue]Parsing menu...[/]")
-    parse_result = site.parser(html)
     meals = parse_result.meals
 
-    if not meals:
-        console.print("[yellow]No dishes found — maybe the structure differs?[/]")
-        return
-
     if parse_result.warnings:
         console.print("[yellow]Warnings during parsing:[/]")
         for warning in parse_result.warnings:
             console.print(f"  • {warning}")
 
+    if not meals:
+        console.print("[yellow]No dishes found — maybe the structure differs?[/]")
+        return
+
     console.print(f"[green]Successfully parsed {len(meals)} meals![/]")
 
     table = presentation.create_meal_table(
@@ -127,11 +159,471 @@ def scrape(
         presentation.print_summary(console, meals)
 
 
-def _resolve_site(key: str) -> MensaSite:
+@app.command()
+def stats(
+    mensa: Optional[List[str]] = typer.Option(
+        None,
+        "--mensa",
+        "-m",
+        help="Key of a mensa to include (repeatable); defaults to all",
+    ),
+    days: int = typer.Option(
+        1, "--days", "-d", min=1, help="Number of days up to today to report on"
+    ),
+    refresh: bool = typer.Option(
+        True,
+        "--refresh/--no-refresh",
+        help="Scrape today's menus before reporting",
+    ),
+) -> None:
+    """Show statistics across sites and days from persisted daily rollups"""
+    sites = [_resolve_site(key) for key in mensa] if mensa else [*SITES.values()]
+    store = RollupStore(paths.cache_dir("stats"))
+
+    if refresh:
+        fetched = []
+        with console.status(f"Fetching {len(sites)} menu(s)..."):
+            for outcome in scraper.iter_sites(sites):
+                if outcome.error is not None:
+                    console.print(
+                        f"[yellow]Skipping {outcome.site.key}: {outcome.error}[/]"
+                    )
+                    continue
+                result = outcome.result
+                date = result.menu_date or scraper.today()
+                store.save(date, outcome.site.key, MealStats.from_meals(result.meals))
+                fetched.append((outcome.site.key, result, date))
+        # Only lock the dish index once the scraping is done.
+        if fetched:
+            with similarity.updating() as dishes:
+                for site_key, result, date in fetched:
+                    dishes.add_result(site_key, result, date)
+
+    end = datetime.date.today()
+    start = end - datetime.timedelta(days=days - 1)
+    merged, covered = store.load(start, end, [site.key for site in sites])
+
+    presentation.print_stats(console, merged, days=covered, sites=len(sites))
+
+
+@app.command()
+def find(
+    query: str = typer.Argument(
+        "", help="Filter, e.g. 'vegan and price < 3 and not allergen:nuts'"
+    ),
+    mensa: Optional[List[str]] = typer.Option(
+        None,
+        "--mensa",
+        "-m",
+        help="Key of a mensa to search (repeatable); defaults to all",
+    ),
+    price_tier: str = typer.Option(
+        "student",
+        "--price-tier",
+        help="Price tier used for price filters and sorting",
+        show_default=True,
+    ),
+    sort: Optional[str] = typer.Option(
+        None, "--sort", help="Sort results by 'price' or 'name'"
+    ),
+    limit: Optional[int] = typer.Option(
+        None, "--limit", "-n", min=1, help="Show at most this many meals"
+    ),
+    page: bool = typer.Option(
+        True,
+        "--page/--no-page",
+        help="Without --sort/--limit, show meals page by page as menus arrive",
+    ),
+) -> None:
+    """Find meals matching a query across all Mensas"""
+    price_tier = _validate_price_tier(price_tier)
+    if sort not in {None, "price", "name"}:
+        raise typer.BadParameter("Sort key must be one of name, price")
+
     try:
-        return SITES[key]
-    except KeyError as exc:
-        available = ", ".join(sorted(SITES))
-        raise typer.BadParameter(
-            f"Unknown mensa '{key}'. Available: {available}"
-        ) from exc
+        where = compile_query(query, price_tier=price_tier)
+    except QueryError as exc:
+        raise typer.BadParameter(str(exc)) from exc
+
+    sites = [_resolve_site(key) for key in mensa] if mensa else [*SITES.values()]
+
+    if sort == "price":
+        def key(match):
+            price = tier_price(match[1], price_tier)
+            return (price is None, price or 0.0, match[1].name, match[0].key)
+    elif sort == "name":
+        def key(match):
+            return (match[1].name.casefold(), match[0].key)
+    else:
+        def key(match):
+            return match[0].key
+
+    if page and sort is None and limit is None:
+        _stream_matches(sites, where, price_tier)
+        return
+
+    matches = []
+    with console.status(f"Searching {len(sites)} menu(s)..."):
+        for outcome in scraper.iter_sites(sites, where=where):
+            if outcome.error is not None:
+                console.print(f"[yellow]Skipping {outcome.site.key}: {outcome.error}[/]")
+                continue
+            found = (
+                (outcome.site, meal)
+                for meal in outcome.result.meals
+                if where.matches(meal)
+            )
+            if limit is None:
+                matches.extend(found)
+            else:
+                # Keep only the current top-k while sites are still arriving.
+                matches = heapq.nsmallest(
+                    limit, itertools.chain(matches, found), key=key
+                )
+
+    matches.sort(key=key)
+
+    if not matches:
+        console.print("[yellow]No matching meals found.[/]")
+        return
+
+    console.print(
+        presentation.create_match_table(matches, price_tier=price_tier)
+    )
+
+
+def _stream_matches(sites: List[MensaSite], where: Query, price_tier: str) -> None:
+    """Print matches in arrival order while the remaining sites are fetched."""
+    skipped = []
+
+    def matches():
+        # Closed by the pager when the reader quits; pass that on to the fetches.
+        with contextlib.closing(scraper.iter_sites(sites, where=where)) as outcomes:
+            for outcome in outcomes:
+                if outcome.error is not None:
+                    skipped.append(outcome)
+                    continue
+                for meal in outcome.result.meals:
+                    if where.matches(meal):
+                        yield outcome.site, meal
+
+    shown = presentation.print_matches(console, matches(), price_tier=price_tier)
+
+    for outcome in skipped:
+        console.print(f"[yellow]Skipping {outcome.site.key}: {outcome.error}[/]")
+    if not shown:
+        console.print("[yellow]No matching meals found.[/]")
+
+
+@app.command()
+def near(
+    lat: float = typer.Option(..., "--lat", min=-90, max=90, help="Latitude"),
+    lon: float = typer.Option(..., "--lon", min=-180, max=180, help="Longitude"),
+    limit: int = typer.Option(5, "--limit", "-n", min=1, help="Number of Mensas"),
+    max_distance: Optional[float] = typer.Option(
+        None, "--max-distance", help="Only include Mensas within this many km"
+    ),
+    scrape_menus: bool = typer.Option(
+        False, "--scrape", help="Also fetch today's menu of each result"
+    ),
+    price_tier: str = typer.Option(
+        "student",
+        "--price-tier",
+        help="Price tier to show with --scrape (student/employee/guest)",
+        show_default=True,
+    ),
+) -> None:
+    """List the Mensas closest to a location"""
+    price_tier = _validate_price_tier(price_tier)
+
+    results = [
+        (distance, SITES[record.key])
+        for distance, record in CATALOG.nearest(
+            lat, lon, limit, max_distance_km=max_distance
+        )
+    ]
+    if not results:
+        console.print("[yellow]No Mensas found nearby.[/]")
+        return
+
+    console.print(presentation.create_distance_table(results))
+    if not scrape_menus:
+        return
+
+    # Print each menu as soon as it arrives instead of waiting for the slowest.
+    distances = {site.key: distance for distance, site in results}
+    for outcome in scraper.iter_sites(site for _, site in results):
+        site = outcome.site
+        console.print(f"\n[bold blue]{site.name}[/] ({distances[site.key]:.2f} km)")
+        if outcome.error is not None:
+            console.print(f"[yellow]Could not fetch menu: {outcome.error}[/]")
+        elif not outcome.result.meals:
+            console.print("[yellow]No dishes found.[/]")
+        else:
+            console.print(
+                presentation.create_meal_table(
+                    outcome.result.meals, price_tier=price_tier
+                )
+            )
+
+
+@app.command()
+def limits() -> None:
+    """Show upstream rate limits and the wait time they caused"""
+    configured = ratelimit.configured_limits()
+    if not configured:
+        console.print("[yellow]No rate limits configured.[/]")
+        return
+
+    metrics = {host: ratelimit.metrics(host) for host in configured}
+    console.print(presentation.create_limits_table(configured, metrics))
+
+
+@jobs_app.command("enqueue")
+def jobs_enqueue(
+    mensa: Optional[List[str]] = typer.Option(
+        None,
+        "--mensa",
+        "-m",
+        help="Key of a mensa to schedule (repeatable); defaults to all",
+    ),
+    days: int = typer.Option(
+        1, "--days", "-d", min=1, help="Number of days starting today"
+    ),
+    force: bool = typer.Option(
+        False, "--force", help="Re-run jobs that already finished or failed"
+    ),
+    queue: Optional[str] = typer.Option(
+        None, "--queue", help="Queue database (path or sqlite:///path)"
+    ),
+) -> None:
+    """Schedule scrape jobs for sites and days"""
+    sites = [_resolve_site(key) for key in mensa] if mensa else [*SITES.values()]
+    job_queue = _open_queue(queue)
+
+    start = datetime.date.today()
+    added = present = 0
+    unsupported: Counter = Counter()
+    for offset in range(days):
+        date = (start + datetime.timedelta(days=offset)).isoformat()
+        for site in sites:
+            if not scraper.supports_date(site, date):
+                unsupported[site.provider] += 1
+            elif job_queue.enqueue(site.key, date, force=force):
+                added += 1
+            else:
+                present += 1
+
+    console.print(f"[green]Queued {added} job(s)[/] ({present} already present).")
+    for provider, count in sorted(unsupported.items()):
+        console.print(
+            f"[yellow]Skipped {count} job(s): {provider} only serves today's menu.[/]"
+        )
+
+
+@jobs_app.command("work")
+def jobs_work(
+    queue: Optional[str] = typer.Option(
+        None, "--queue", help="Queue database (path or sqlite:///path)"
+    ),
+    sink: Optional[str] = typer.Option(
+        None, "--sink", help="JSON lines file receiving parse results"
+    ),
+    concurrency: int = typer.Option(
+        1, "--concurrency", "-c", min=1, help="Worker threads in this process"
+    ),
+    lease: float = typer.Option(
+        jobs.DEFAULT_LEASE_SECONDS, "--lease", min=1, help="Job lease in seconds"
+    ),
+    wait: bool = typer.Option(
+        False, "--wait/--exit-when-idle", help="Keep polling when the queue is empty"
+    ),
+) -> None:
+    """Process queued scrape jobs until the queue is drained"""
+    job_queue = _open_queue(queue)
+    result_sink = jobs.JsonlSink(Path(sink or _default_sink()))
+
+    try:
+        stats = jobs.run_workers(
+            job_queue,
+            result_sink,
+            SITES,
+            concurrency=concurrency,
+            lease_seconds=lease,
+            exit_when_idle=not wait,
+        )
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrupted; leased jobs will be retried.[/]")
+        raise typer.Exit(code=130)
+
+    console.print(
+        f"[green]Done: {stats.done}[/], failed: {stats.failed}, "
+        f"retried: {stats.retried}, lost leases: {stats.lost}"
+    )
+
+
+@jobs_app.command("status")
+def jobs_status(
+    queue: Optional[str] = typer.Option(
+        None, "--queue", help="Queue database (path or sqlite:///path)"
+    ),
+) -> None:
+    """Show the number of jobs per state"""
+    counts = _open_queue(queue).counts()
+    for state, count in counts.items():
+        console.print(f"• {state}: {count}")
+
+
+def _updated_dish_index(sink: Optional[str]) -> similarity.DishIndex:
+    """Load the dish index after importing new results from the jobs sink."""
+    with similarity.updating() as index:
+        records = index.import_jsonl(Path(sink or _default_sink()))
+    if records:
+        console.print(f"[blue]Indexed {records} new result(s).[/]")
+    return index
+
+
+@dishes_app.command("similar")
+def dishes_similar(
+    name: str = typer.Argument(..., help="Dish name to look up"),
+    threshold: float = typer.Option(
+        similarity.DEFAULT_THRESHOLD,
+        "--threshold",
+        "-t",
+        min=0.0,
+        max=1.0,
+        help="Minimum estimated similarity",
+    ),
+    limit: int = typer.Option(20, "--limit", "-n", min=1, help="Show at most this many dishes"),
+    sink: Optional[str] = typer.Option(
+        None, "--sink", help="JSON lines results file to import first"
+    ),
+) -> None:
+    """Show known dishes whose names are near-duplicates of NAME"""
+    index = _updated_dish_index(sink)
+    matches = index.similar(name, threshold=threshold, limit=limit)
+    if not matches:
+        console.print(f"[yellow]No dishes similar to '{name}' among {len(index)} known.[/]")
+        return
+    console.print(presentation.create_similar_dish_table(matches))
+
+
+@dishes_app.command("recurring")
+def dishes_recurring(
+    threshold: float = typer.Option(
+        similarity.DEFAULT_THRESHOLD,
+        "--threshold",
+        "-t",
+        min=0.0,
+        max=1.0,
+        help="Minimum estimated similarity for names to count as one dish",
+    ),
+    min_days: int = typer.Option(
+        2, "--min-days", min=1, help="Only show dishes served on this many days"
+    ),
+    limit: int = typer.Option(20, "--limit", "-n", min=1, help="Show at most this many dishes"),
+    sink: Optional[str] = typer.Option(
+        None, "--sink", help="JSON lines results file to import first"
+    ),
+) -> None:
+    """Show the dishes served most often, merging spelling variants"""
+    index = _updated_dish_index(sink)
+    clusters = [
+        cluster
+        for cluster in index.clusters(threshold=threshold)
+        if cluster.days >= min_days
+    ][:limit]
+    if not clusters:
+        console.print(f"[yellow]No recurring dishes among {len(index)} known.[/]")
+        return
+    console.print(presentation.create_dish_cluster_table(clusters))
+
+
+@app.command()
+def loadtest(
+    requests_total: int = typer.Option(
+        100, "--requests", "-r", min=1, help="Requests per scenario"
+    ),
+    concurrency: List[int] = typer.Option(
+        [8], "--concurrency", "-c", min=1, help="Concurrent clients (repeatable)"
+    ),
+    latency: List[float] = typer.Option(
+        [0.05], "--latency", min=0, help="Server latency in seconds (repeatable)"
+    ),
+    jitter: float = typer.Option(0.0, "--jitter", min=0, help="Latency jitter in seconds"),
+    error_rate: List[float] = typer.Option(
+        [0.0], "--error-rate", min=0, max=1, help="Share of 503 responses (repeatable)"
+    ),
+    throttle: float = typer.Option(
+        0.0, "--throttle", min=0, help="Server-side limit in req/s (0 disables)"
+    ),
+    etag: bool = typer.Option(
+        True,
+        "--etag/--no-etag",
+        help="Let the stand-in send ETags, so the client revalidates with If-None-Match",
+    ),
+    mode: str = typer.Option(
+        "scraper", "--mode", help="Drive the in-process scraper or 'cli' subprocesses"
+    ),
+    mensa: Optional[List[str]] = typer.Option(
+        None, "--mensa", "-m", help="Key of a mensa to serve (repeatable); defaults to all"
+    ),
+    seed: Optional[int] = typer.Option(None, "--seed", help="Seed for injected faults"),
+) -> None:
+    """Load-test the scraping stack against a local stand-in server"""
+    from .loadtest import MODES, run_scenario
+    from .standin import ServerConfig
+
+    if mode not in MODES:
+        raise typer.BadParameter(f"Mode must be one of {', '.join(MODES)}")
+
+    sites = [_resolve_site(key) for key in mensa] if mensa else [*SITES.values()]
+
+    reports = []
+    for clients, delay, errors in itertools.product(concurrency, latency, error_rate):
+        config = ServerConfig(
+            latency=delay,
+            jitter=jitter,
+            error_rate=errors,
+            etag=etag,
+            throttle_rate=throttle,
+            throttle_burst=max(1, int(throttle)),
+            seed=seed,
+        )
+        with console.status(f"Running {mode} c={clients} latency={delay}..."):
+            reports.append(
+                run_scenario(
+                    sites,
+                    config,
+                    requests_total=requests_total,
+                    concurrency=clients,
+                    mode=mode,
+                )
+            )
+
+    console.print(presentation.create_load_report_table(reports))
+
+
+@app.command(
+    context_settings={"allow_extra_args": True, "ignore_unknown_options": True},
+    add_help_option=False,
+)
+def status(ctx: typer.Context) -> None:
+    """Print today's menu on one line, cached for shell prompts"""
+    from .status import main as status_main
+
+    raise typer.Exit(code=status_main(ctx.args))
+
+
+def _resolve_site(key: str) -> MensaSite:
+    record = CATALOG.resolve(key)
+    if record is not None:
+        return SITES[record.key]
+
+    suggestions = CATALOG.search(key, limit=3)
+    if suggestions:
+        hint = ", ".join(record.key for _, record in suggestions)
+        message = f"Unknown mensa '{key}'. Did you mean: {hint}?"
+    else:
+        message = f"Unknown mensa '{key}'. Run 'mensa list' to see all Mensas."
+    raise typer.BadParameter(message)
@@ -0,0 +1,210 @@
+"""Spatial lookup of Mensa locations."""
+
+from __future__ import annotations
+
+import base64
+import heapq
+import math
+from array import array
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+EARTH_RADIUS_KM = 6371.0088
+
+Point = Tuple[float, float, float]
+
+
+def to_cartesian(latitude: float, longitude: float) -> Point:
+    """Project a coordinate onto the unit sphere."""
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _chord_to_km(squared_chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+def _pack(typecode: str, values: Iterable[Any]) -> str:
+    return base64.b64encode(array(typecode, values).tobytes()).decode("ascii")
+
+
+def _unpack(typecode: str, text: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text, validate=True))
+    return values
+
+
+class KDTree(Generic[T]):
+    """Static 3-d tree over points on the unit sphere.
+
+    Coordinates are stored as Cartesian unit vectors, so Euclidean (chord)
+    distance orders points exactly like great-circle distance and no
+    special handling is needed near the poles or the antimeridian.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[float, float, T]]) -> None:
+        self._points: List[Point] = []
+        self._items: List[T] = []
+        for latitude, longitude, item in entries:
+            self._points.append(to_cartesian(latitude, longitude))
+            self._items.append(item)
+
+        size = len(self._points)
+        self._left = [-1] * size
+        self._right = [-1] * size
+        self._axis = [0] * size
+        self._root = self._build([*range(size)], 0)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    @property
+    def items(self) -> Sequence[T]:
+        return self._items
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-compatible form of the built tree, without the items.
+
+        Coordinates and links are packed as base64 arrays, which restore
+        much faster than nested JSON lists.
+        """
+        return {
+            "points": _pack("d", (c for point in self._points for c in point)),
+            "left": _pack("i", self._left),
+            "right": _pack("i", self._right),
+            "axis": _pack("b", self._axis),
+            "root": self._root,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], items: Sequence[T]) -> "KDTree[T]":
+        """Restore a tree from :meth:`to_dict` output without rebuilding it."""
+        flat = _unpack("d", data["points"])
+        left = _unpack("i", data["left"]).tolist()
+        right = _unpack("i", data["right"]).tolist()
+        axis = _unpack("b", data["axis"]).tolist()
+        root = int(data["root"])
+        size = len(items)
+        if not (
+            len(flat) == 3 * size
+            and len(left) == len(right) == len(axis) == size
+            and -1 <= root < size
+            and all(0 <= value < 3 for value in axis)
+        ):
+            raise ValueError("Inconsistent k-d tree data")
+
+        # Every node has at most one parent and the root none, so a query
+        # walking down from the root always terminates.
+        children = [node for node in (*left, *right) if node != -1]
+        if (
+            len(set(children)) != len(children)
+            or root in children
+            or any(not 0 <= node < size for node in children)
+        ):
+            raise ValueError("Inconsistent k-d tree links")
+
+        tree = cls.__new__(cls)
+        coordinates = iter(flat)
+        tree._points = [*zip(coordinates, coordinates, coordinates)]
+        tree._items = [*items]
+        tree._left, tree._right, tree._axis, tree._root = left, right, axis, root
+        return tree
+
+    def _build(self, indices: List[int], depth: int) -> int:
+        if not indices:
+            return -1
+
+        axis = depth % 3
+        indices.sort(key=lambda index: self._points[index][axis])
+        middle = len(indices) // 2
+        node = indices[middle]
+
+        self._axis[node] = axis
+        self._left[node] = self._build(indices[:middle], depth + 1)
+        self._right[node] = self._build(indices[middle + 1 :], depth + 1)
+        return node
+
+    def nearest(
+        self, latitude: float, longitude: float, k: int = 1
+    ) -> List[Tuple[float, T]]:
+        """Return up to ``k`` ``(distance_km, item)`` pairs, closest first."""
+        if k <= 0 or self._root < 0:
+            return []
+
+        target = to_cartesian(latitude, longitude)
+        # Max-heap of the best candidates so far, keyed by negated distance.
+        best: List[Tuple[float, int]] = []
+
+        # Each entry carries the squared distance to the splitting plane that
+        # separates it from the target, so subtrees out of reach are skipped.
+        stack: List[Tuple[int, float]] = [(self._root, 0.0)]
+        while stack:
+            node, plane = stack.pop()
+            if node < 0 or (len(best) == k and plane >= -best[0][0]):
+                continue
+
+            point = self._points[node]
+            squared = (
+                (point[0] - target[0]) ** 2
+                + (point[1] - target[1]) ** 2
+                + (point[2] - target[2]) ** 2
+            )
+            if len(best) < k:
+                heapq.heappush(best, (-squared, node))
+            elif squared < -best[0][0]:
+                heapq.heapreplace(best, (-squared, node))
+
+            axis = self._axis[node]
+            delta = target[axis] - point[axis]
+            near, far = (
+                (self._left[node], self._right[node])
+                if delta < 0
+                else (self._right[node], self._left[node])
+            )
+            # The far side is pushed first so the near side is searched first.
+            stack.append((far, max(plane, delta * delta)))
+            stack.append((near, plane))
+
+        return [
+            (_chord_to_km(-negated), self._items[node])
+            for negated, node in sorted(best, reverse=True)
+        ]
+
+
+def nearest_sites(
+    index: KDTree[T],
+    latitude: float,
+    longitude: float,
+    k: int = 5,
+    *,
+    max_distance_km: Optional[float] = None,
+) -> List[Tuple[float, T]]:
+    """Query a prebuilt index; build it once and reuse it across lookups."""
+    results = index.nearest(latitude, longitude, k)
+    if max_distance_km is not None:
+        results = [item for item in results if item[0] <= max_distance_km]
+    return results
@@ -2,11 +2,15 @@
 from __future__ import annotations
 
 import logging
-from typing import Mapping, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, Mapping, Optional, Tuple
 from urllib.parse import quote, urlsplit, urlunsplit
 
 import requests
 
+from mensa import ratelimit
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_HEADERS: Mapping[str, str] = {
@@ -20,6 +24,17 @@ DEFAULT_HEADERS: Mapping[str, str] = {
     "Connection": "keep-alive",
 }
 
+JSON_HEADERS: Mapping[str, str] = {
+    **DEFAULT_HEADERS,
+    "Accept": "application/json",
+}
+
+# Pages whose ETag is remembered for conditional requests, least recently
+# used first: normalized URL -> (ETag, body).
+VALIDATOR_CACHE_SIZE = 128
+_validators: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+_validators_lock = threading.Lock()
+
 
 def normalize_url(url: str) -> str:
     """Percent-encode path and query components for stability."""
@@ -35,12 +50,74 @@ def fetch_html(
     session: Optional[requests.Session] = None,
     headers: Optional[Mapping[str, str]] = None,
     timeout: int = 10,
+    conditional: bool = True,
 ) -> str:
-    """Fetch HTML content from the given URL using provided session/settings."""
+    """Fetch HTML content from the given URL using provided session/settings.
+
+    Requests wait for the host's shared rate limit (see :mod:`mensa.ratelimit`).
+    With ``conditional``, a page fetched before in this process is requested
+    with ``If-None-Match`` and its remembered body is reused on ``304``.
+    """
     normalized = normalize_url(url)
     client = session or requests
+    headers = {**(headers or DEFAULT_HEADERS)}
+    cached = _validator(normalized) if conditional else None
+    if cached is not None:
+        headers["If-None-Match"] = cached[0]
+
+    ratelimit.acquire(urlsplit(normalized).hostname)
 
     logger.debug("Fetching URL %s", normalized)
-    response = client.get(normalized, timeout=timeout, headers=headers or DEFAULT_HEADERS)
+    response = client.get(normalized, timeout=timeout, headers=headers)
+    if response.status_code == 304 and cached is not None:
+        logger.debug("%s not modified", normalized)
+        return cached[1]
     response.raise_for_status()
+
+    etag = response.headers.get("ETag")
+    if conditional and etag:
+        _remember(normalized, etag, response.text)
     return response.text
+
+
+def _validator(url: str) -> Optional[Tuple[str, str]]:
+    with _validators_lock:
+        cached = _validators.get(url)
+        if cached is not None:
+            _validators.move_to_end(url)
+        return cached
+
+
+def _remember(url: str, etag: str, body: str) -> None:
+    with _validators_lock:
+        _validators[url] = (etag, body)
+        _validators.move_to_end(url)
+        while len(_validators) > VALIDATOR_CACHE_SIZE:
+            _validators.popitem(last=False)
+
+
+def clear_validators() -> None:
+    """Forget remembered ETags, so the next fetch of every page is unconditional."""
+    with _validators_lock:
+        _validators.clear()
+
+
+def fetch_json(
+    url: str,
+    *,
+    params: Optional[Mapping[str, str]] = None,
+    session: Optional[requests.Session] = None,
+    timeout: int = 10,
+) -> Any:
+    """Fetch and decode a JSON document, honouring the host's rate limit."""
+    normalized = normalize_url(url)
+    client = session or requests
+
+    ratelimit.acquire(urlsplit(normalized).hostname)
+
+    logger.debug("Fetching JSON %s %s", normalized, params or "")
+    response = client.get(
+        normalized, params=params, timeout=timeout, headers=JSON_HEADERS
+    )
+    response.raise_for_status()
+    return response.json()
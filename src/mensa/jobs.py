@@ -0,0 +1,470 @@
+"""Shared work queue of scrape jobs and the worker loop that drains it.
+
+A job is one ``(site, date)`` pair. Workers claim jobs with a lease; a job
+whose lease expires (because its worker died) becomes claimable again.
+Failed jobs are retried with exponential backoff until ``max_attempts`` is
+reached; an expired lease counts as a failed attempt, so a job that keeps
+killing its worker ends up failed as well. Enqueuing an existing ``(site, date)`` pair is a no-op, so several
+producers can schedule the same horizon without duplicating work.
+
+Queues are opened from a URL (see :func:`open_queue`): ``sqlite:///path``
+for a database shared by processes on one machine, or ``memory:`` for an
+in-process stand-in (useful with :func:`run_workers` only, since it is gone
+when the process exits). More backends can be added to :data:`QUEUE_BACKENDS`.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol
+
+from mensa import scraper
+from mensa.providers.types import MensaSite, ParseResult
+from mensa.serialization import result_to_dict
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 30.0
+LEASE_EXPIRED = "lease expired"
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+@dataclass(frozen=True)
+class Job:
+    """A claimed or queued scrape job."""
+
+    id: int
+    site_key: str
+    date: str
+    attempts: int = 0
+    lease_owner: Optional[str] = None
+
+
+class JobQueue(Protocol):
+    """Backend contract for scrape job queues."""
+
+    def enqueue(self, site_key: str, date: str, *, force: bool = False) -> bool:
+        """Add a job; return ``False`` if it was already queued or done.
+
+        With ``force`` a finished or failed job is reset to pending.
+        """
+        ...
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        """Lease the next available job to ``worker_id``."""
+        ...
+
+    def complete(self, job: Job) -> bool:
+        """Mark a job done; return ``False`` if the lease was lost."""
+        ...
+
+    def fail(self, job: Job, error: str, *, retry: bool = True) -> Optional[bool]:
+        """Record a failure and reschedule the job if attempts remain.
+
+        Returns ``True`` if the job was rescheduled for another attempt,
+        ``False`` if it failed for good and ``None`` if the lease was lost.
+        """
+        ...
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per state."""
+        ...
+
+
+def retry_delay(attempts: int) -> float:
+    return RETRY_BASE_DELAY * 2 ** max(0, attempts - 1)
+
+
+class SQLiteJobQueue:
+    """Job queue stored in a SQLite database shared between processes.
+
+    Claims run inside ``BEGIN IMMEDIATE`` transactions, so two workers never
+    lease the same job.
+    """
+
+    def __init__(self, path: Path, *, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY,
+                    site_key TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    UNIQUE (site_key, date)
+                )
+                """
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, available_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def enqueue(self, site_key: str, date: str, *, force: bool = False) -> bool:
+        with self._transaction() as db:
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO jobs (site_key, date, available_at) "
+                "VALUES (?, ?, ?)",
+                (site_key, date, time.time()),
+            )
+            if cursor.rowcount or not force:
+                return bool(cursor.rowcount)
+            cursor = db.execute(
+                "UPDATE jobs SET state = 'pending', attempts = 0, available_at = ?, "
+                "lease_owner = NULL, lease_expires = NULL, last_error = NULL "
+                "WHERE site_key = ? AND date = ? AND state IN ('done', 'failed')",
+                (time.time(), site_key, date),
+            )
+            return bool(cursor.rowcount)
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET state = 'failed', lease_owner = NULL, "
+                "lease_expires = NULL, last_error = ? "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (LEASE_EXPIRED, now, self.max_attempts),
+            )
+            row = db.execute(
+                "SELECT id, site_key, date, attempts FROM jobs "
+                "WHERE (state = 'pending' AND available_at <= ?) "
+                "   OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY available_at, id LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, site_key, date, attempts = row
+            db.execute(
+                "UPDATE jobs SET state = 'leased', attempts = ?, lease_owner = ?, "
+                "lease_expires = ? WHERE id = ?",
+                (attempts + 1, worker_id, now + lease_seconds, job_id),
+            )
+        return Job(job_id, site_key, date, attempts + 1, worker_id)
+
+    def complete(self, job: Job) -> bool:
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET state = 'done', lease_owner = NULL, "
+                "lease_expires = NULL, last_error = NULL "
+                "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (job.id, job.lease_owner),
+            )
+            return bool(cursor.rowcount)
+
+    def fail(self, job: Job, error: str, *, retry: bool = True) -> Optional[bool]:
+        final = not retry or job.attempts >= self.max_attempts
+        with self._transaction() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET state = ?, available_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL, last_error = ? "
+                "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (
+                    "failed" if final else "pending",
+                    time.time() + (0 if final else retry_delay(job.attempts)),
+                    error,
+                    job.id,
+                    job.lease_owner,
+                ),
+            )
+        return not final if cursor.rowcount else None
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute(
+            "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+        )
+        return {state: 0 for state in STATES} | dict(rows.fetchall())
+
+
+@dataclass
+class _MemoryEntry:
+    job: Job
+    state: str = "pending"
+    available_at: float = 0.0
+    lease_expires: float = 0.0
+    last_error: Optional[str] = None
+
+
+class MemoryJobQueue:
+    """In-process queue with the same semantics as :class:`SQLiteJobQueue`."""
+
+    def __init__(self, *, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.max_attempts = max_attempts
+        self._entries: Dict[tuple[str, str], _MemoryEntry] = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, site_key: str, date: str, *, force: bool = False) -> bool:
+        with self._lock:
+            entry = self._entries.get((site_key, date))
+            if entry is None:
+                job = Job(len(self._entries) + 1, site_key, date)
+                self._entries[(site_key, date)] = _MemoryEntry(job, available_at=time.time())
+                return True
+            if force and entry.state in {"done", "failed"}:
+                self._entries[(site_key, date)] = _MemoryEntry(
+                    replace(entry.job, attempts=0, lease_owner=None),
+                    available_at=time.time(),
+                )
+                return True
+            return False
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[Job]:
+        now = time.time()
+        with self._lock:
+            for entry in self._entries.values():
+                if (
+                    entry.state == "leased"
+                    and entry.lease_expires < now
+                    and entry.job.attempts >= self.max_attempts
+                ):
+                    entry.state = "failed"
+                    entry.last_error = LEASE_EXPIRED
+            ready = [
+                entry
+                for entry in self._entries.values()
+                if (entry.state == "pending" and entry.available_at <= now)
+                or (entry.state == "leased" and entry.lease_expires < now)
+            ]
+            if not ready:
+                return None
+            entry = min(ready, key=lambda item: (item.available_at, item.job.id))
+            entry.job = replace(
+                entry.job, attempts=entry.job.attempts + 1, lease_owner=worker_id
+            )
+            entry.state = "leased"
+            entry.lease_expires = now + lease_seconds
+            return entry.job
+
+    def _owned(self, job: Job) -> Optional[_MemoryEntry]:
+        entry = self._entries.get((job.site_key, job.date))
+        if entry is None or entry.state != "leased":
+            return None
+        if entry.job.lease_owner != job.lease_owner:
+            return None
+        return entry
+
+    def complete(self, job: Job) -> bool:
+        with self._lock:
+            entry = self._owned(job)
+            if entry is None:
+                return False
+            entry.state = "done"
+            return True
+
+    def fail(self, job: Job, error: str, *, retry: bool = True) -> Optional[bool]:
+        with self._lock:
+            entry = self._owned(job)
+            if entry is None:
+                return None
+            final = not retry or job.attempts >= self.max_attempts
+            entry.state = "failed" if final else "pending"
+            entry.available_at = time.time() + (0 if final else retry_delay(job.attempts))
+            entry.last_error = error
+            return not final
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {state: 0 for state in STATES}
+            for entry in self._entries.values():
+                counts[entry.state] += 1
+            return counts
+
+
+QUEUE_BACKENDS: Dict[str, Callable[[str], JobQueue]] = {
+    "sqlite": lambda location: SQLiteJobQueue(Path(location)),
+    "memory": lambda location: MemoryJobQueue(),
+}
+
+
+def open_queue(url: str) -> JobQueue:
+    """Open a queue from ``scheme:location``; bare paths mean SQLite."""
+    scheme, separator, location = url.partition(":")
+    if not separator or scheme not in QUEUE_BACKENDS:
+        return SQLiteJobQueue(Path(url))
+    return QUEUE_BACKENDS[scheme](location.removeprefix("//"))
+
+
+class ResultSink(Protocol):
+    """Destination for results produced by workers."""
+
+    def write(self, site: MensaSite, date: str, result: ParseResult) -> None:
+        ...
+
+
+class JsonlSink:
+    """Append results as JSON lines to a file shared by all workers.
+
+    Each record is written with a single ``write`` under an exclusive lock so
+    lines from concurrent workers never interleave.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def write(self, site: MensaSite, date: str, result: ParseResult) -> None:
+        record = {"site": site.key, "date": date, "result": result_to_dict(result)}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.path.open("a", encoding="utf-8") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.write(line)
+                handle.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+@dataclass
+class WorkerStats:
+    done: int = 0
+    failed: int = 0
+    retried: int = 0
+    lost: int = 0
+
+
+def run_worker(
+    queue: JobQueue,
+    sink: ResultSink,
+    sites: Dict[str, MensaSite],
+    *,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    poll_interval: float = 1.0,
+    exit_when_idle: bool = True,
+    stop: Optional[threading.Event] = None,
+) -> WorkerStats:
+    """Claim and process jobs until the queue is drained or ``stop`` is set.
+
+    With ``exit_when_idle`` the worker keeps polling while jobs are still
+    pending (e.g. scheduled for a retry) or leased by other workers, and
+    exits once every job is done or failed.
+    """
+    worker_id = worker_id or default_worker_id()
+    stop = stop or threading.Event()
+    stats = WorkerStats()
+
+    def failed(job: Job, error: str, *, retry: bool = True) -> None:
+        rescheduled = queue.fail(job, error, retry=retry)
+        if rescheduled is None:
+            logger.warning("Lease on %s/%s expired before it failed", job.site_key, job.date)
+            stats.lost += 1
+        elif rescheduled:
+            stats.retried += 1
+        else:
+            stats.failed += 1
+
+    while not stop.is_set():
+        job = queue.claim(worker_id, lease_seconds)
+        if job is None:
+            if exit_when_idle:
+                counts = queue.counts()
+                if not counts.get("pending") and not counts.get("leased"):
+                    break
+            stop.wait(poll_interval)
+            continue
+
+        site = sites.get(job.site_key)
+        if site is None:
+            failed(job, f"Unknown mensa '{job.site_key}'", retry=False)
+            continue
+
+        try:
+            result = scraper.fetch_site(site, date=job.date)
+            sink.write(site, job.date, result)
+        except scraper.UnsupportedDateError as exc:
+            failed(job, str(exc), retry=False)
+            continue
+        except Exception as exc:  # noqa: BLE001 - recorded on the job
+            logger.warning("Job %s/%s failed: %s", job.site_key, job.date, exc)
+            failed(job, str(exc))
+            continue
+
+        if queue.complete(job):
+            stats.done += 1
+        else:
+            logger.warning("Lease on %s/%s expired before completion", job.site_key, job.date)
+            stats.lost += 1
+
+    return stats
+
+
+def run_workers(
+    queue: JobQueue,
+    sink: ResultSink,
+    sites: Dict[str, MensaSite],
+    *,
+    concurrency: int = 1,
+    **options,
+) -> WorkerStats:
+    """Run ``concurrency`` worker threads sharing one queue and sink."""
+    totals = WorkerStats()
+    lock = threading.Lock()
+
+    def work() -> None:
+        stats = run_worker(queue, sink, sites, **options)
+        with lock:
+            totals.done += stats.done
+            totals.failed += stats.failed
+            totals.retried += stats.retried
+            totals.lost += stats.lost
+
+    threads: List[threading.Thread] = [
+        threading.Thread(target=work, daemon=True) for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return totals
@@ -0,0 +1,182 @@
+"""Load-test harness driving the real fetch/parse stack against a stand-in.
+
+Each scenario starts a :class:`~mensa.standin.StandInServer` that serves a
+fixture speiseplan page at the path of every site, then issues requests
+either in-process through :func:`mensa.scraper.fetch_site` (``scraper``
+mode) or by running ``python -m mensa scrape`` subprocesses against a
+temporary catalogue that points at the stand-in (``cli`` mode). Request
+coalescing is switched off so that every request reaches the server.
+
+With ETags enabled, the in-process scraper revalidates pages it fetched
+before (see :func:`mensa.http.fetch_html`), so repeated requests show up as
+``304`` responses; each ``cli`` process starts without remembered ETags.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import requests
+
+from mensa import http, scraper
+from mensa.providers.types import MensaSite
+from mensa.standin import ServerConfig, StandInServer
+
+MODES = ("scraper", "cli")
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    # Rounded first so that e.g. 0.07 * 100 = 7.000000000000001 ranks as 7.
+    rank = math.ceil(round(q * len(sorted_values), 9)) - 1
+    rank = max(0, min(len(sorted_values) - 1, rank))
+    return sorted_values[rank]
+
+
+@dataclass
+class LoadReport:
+    """Outcome of one load-test scenario."""
+
+    label: str
+    requests: int
+    concurrency: int
+    elapsed: float
+    latencies: List[float] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+    server_statuses: Counter = field(default_factory=Counter)
+
+    @property
+    def ok(self) -> int:
+        return self.requests - sum(self.errors.values())
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def latency(self, q: float) -> Optional[float]:
+        return percentile(self.latencies, q)
+
+
+def _describe_error(exc: BaseException) -> str:
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return f"HTTP {exc.response.status_code}"
+    return type(exc).__name__
+
+
+def _scraper_call(site: MensaSite) -> Callable[[], Optional[str]]:
+    def call() -> Optional[str]:
+        try:
+            scraper.fetch_site(site, coalesce=False)
+        except Exception as exc:  # noqa: BLE001 - counted in the report
+            return _describe_error(exc)
+        return None
+
+    return call
+
+
+def _cli_call(site: MensaSite, env: dict[str, str]) -> Callable[[], Optional[str]]:
+    command = [sys.executable, "-m", "mensa", "scrape", "-m", site.key]
+
+    def call() -> Optional[str]:
+        completed = subprocess.run(command, env=env, capture_output=True, check=False)
+        return None if completed.returncode == 0 else f"exit {completed.returncode}"
+
+    return call
+
+
+def _write_catalog(path: Path, sites: Sequence[MensaSite]) -> None:
+    records = [
+        {
+            "key": site.key,
+            "name": site.name,
+            "url": site.url,
+            "provider": site.provider,
+            "city": site.city,
+            "latitude": site.latitude,
+            "longitude": site.longitude,
+        }
+        for site in sites
+    ]
+    path.write_text(json.dumps({"sites": records}, ensure_ascii=False), encoding="utf-8")
+
+
+def run_scenario(
+    sites: Sequence[MensaSite],
+    config: ServerConfig,
+    *,
+    requests_total: int = 100,
+    concurrency: int = 8,
+    mode: str = "scraper",
+    page: Optional[str] = None,
+) -> LoadReport:
+    """Run one scenario and return its report.
+
+    Requests are spread round-robin over ``sites``.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown load-test mode '{mode}'")
+    if not sites:
+        raise ValueError("No sites to load-test")
+
+    label = f"{mode} c={concurrency} lat={config.latency * 1000:g}ms"
+    if config.jitter:
+        label += f"±{config.jitter * 1000:g}"
+    if config.error_rate:
+        label += f" err={config.error_rate:.0%}"
+    if config.throttle_rate:
+        label += f" throttle={config.throttle_rate:g}/s"
+    if not config.etag:
+        label += " no-etag"
+
+    # Every scenario starts without ETags remembered by earlier ones.
+    http.clear_validators()
+    with StandInServer(config) as server, tempfile.TemporaryDirectory() as tmp:
+        server.add_sites(sites, page)
+        local_sites = [replace(site, url=server.local_url(site.url)) for site in sites]
+
+        if mode == "scraper":
+            calls = [_scraper_call(site) for site in local_sites]
+        else:
+            catalog = Path(tmp) / "sites.json"
+            _write_catalog(catalog, local_sites)
+            env = {
+                **os.environ,
+                "MENSA_CATALOG": str(catalog),
+                "MENSA_CACHE_DIR": str(Path(tmp) / "cache"),
+                "MENSA_SINGLEFLIGHT_WINDOW": "0",
+            }
+            calls = [_cli_call(site, env) for site in local_sites]
+
+        def timed(index: int) -> tuple[float, Optional[str]]:
+            started = time.perf_counter()
+            error = calls[index % len(calls)]()
+            return time.perf_counter() - started, error
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = [*pool.map(timed, range(requests_total))]
+        elapsed = time.perf_counter() - started
+
+        report = LoadReport(
+            label=label,
+            requests=requests_total,
+            concurrency=concurrency,
+            elapsed=elapsed,
+            latencies=sorted(latency for latency, _ in outcomes),
+            errors=Counter(error for _, error in outcomes if error is not None),
+            server_statuses=Counter(server.stats.statuses),
+        )
+    return report
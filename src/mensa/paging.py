@@ -0,0 +1,274 @@
+"""Paged, streaming rendering of large tables.
+
+:class:`PagedTable` never builds a table of all rows. Rows are pulled from
+an iterator on a background thread and printed in small Rich tables that
+share fixed column widths, so the output reads as one table:
+
+* Rows already received are flushed as soon as the source stalls (e.g. the
+  next site is still being fetched), so the first screen shows up
+  immediately.
+* Column widths come from streaming statistics of the cell lengths seen so
+  far (a length histogram per column), not from measuring every cell. They
+  only change at page boundaries, where the header is repeated; longer cells
+  within a page are cut off with an ellipsis.
+* On an interactive terminal the output pauses after each screenful until
+  Enter is pressed (``q`` stops). Rows that arrive meanwhile wait in a
+  bounded buffer, so at most a few pages are held in memory.
+* Otherwise (e.g. output redirected to a file) there are no pages: the
+  header is printed once and the widths are fixed by the first screenful
+  of rows, after which rows are streamed in chunks under it.
+* Quitting closes the source iterator, so a generator that is still
+  fetching rows (e.g. from :func:`mensa.scraper.iter_sites`) stops early.
+"""
+
+from __future__ import annotations
+
+import queue
+import sys
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from rich.console import Console
+from rich.table import Table
+
+Row = Sequence[str]
+
+# Seconds to wait for the next row before flushing what has arrived.
+FLUSH_AFTER = 0.1
+# Lines per page used by the table header, its rule and the pager prompt.
+_PAGE_OVERHEAD = 4
+# Characters used per column for the separator and padding.
+_COLUMN_OVERHEAD = 3
+
+_DONE = object()
+
+
+@dataclass(slots=True)
+class ColumnSpec:
+    """Header, style and width bounds of one column."""
+
+    header: str
+    style: str = ""
+    justify: str = "left"
+    min_width: int = 3
+    max_width: int = 40
+    ratio: int = 1
+
+
+@dataclass(slots=True)
+class WidthStats:
+    """Histogram of cell lengths, capped at the column's maximum width."""
+
+    cap: int
+    lengths: Counter = field(default_factory=Counter)
+    count: int = 0
+
+    def add(self, length: int) -> None:
+        self.lengths[min(length, self.cap)] += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> int:
+        if not self.count:
+            return 0
+        target = q * self.count
+        seen = 0
+        for length in sorted(self.lengths):
+            seen += self.lengths[length]
+            if seen >= target:
+                return length
+        return self.cap
+
+
+def fit_widths(
+    columns: Sequence[ColumnSpec], wanted: Sequence[int], available: int
+) -> List[int]:
+    """Shrink ``wanted`` widths to fit ``available`` characters.
+
+    Space is taken one character at a time from the column with the most
+    room above its minimum (weighted by ``ratio``); headers are only cut
+    when every column is at its minimum.
+    """
+    floors = [
+        max(column.min_width, min(len(column.header), column.max_width))
+        for column in columns
+    ]
+    widths = [
+        max(floor, min(column.max_width, width))
+        for column, floor, width in zip(columns, floors, wanted)
+    ]
+    excess = sum(widths) - (available - _COLUMN_OVERHEAD * len(columns))
+    while excess > 0:
+        slack, index = max(
+            (column.ratio * (width - floor), index)
+            for index, (column, width, floor) in enumerate(zip(columns, widths, floors))
+        )
+        if slack <= 0:
+            break
+        widths[index] -= 1
+        excess -= 1
+    return widths
+
+
+class PagedTable:
+    """Render rows from an iterator page by page; see the module docstring."""
+
+    def __init__(
+        self,
+        console: Console,
+        columns: Sequence[ColumnSpec],
+        *,
+        page_size: Optional[int] = None,
+        interactive: Optional[bool] = None,
+        quantile: float = 0.95,
+        header_style: str = "bold green",
+    ) -> None:
+        self.console = console
+        self.columns = [*columns]
+        self.page_size = page_size or max(5, console.height - _PAGE_OVERHEAD)
+        if interactive is None:
+            interactive = console.is_terminal and sys.stdin.isatty()
+        self.interactive = interactive
+        self.quantile = quantile
+        self.header_style = header_style
+        self.stats = [
+            WidthStats(cap=max(column.max_width, len(column.header)))
+            for column in self.columns
+        ]
+        for stats, column in zip(self.stats, self.columns):
+            stats.add(len(column.header))
+        self.widths: List[int] = []
+        self.rows_shown = 0
+
+    def _observe(self, row: Row) -> None:
+        for stats, cell in zip(self.stats, row):
+            stats.add(len(cell))
+
+    def _update_widths(self) -> None:
+        wanted = [stats.quantile(self.quantile) for stats in self.stats]
+        self.widths = fit_widths(self.columns, wanted, self.console.width)
+
+    def _print(self, rows: List[Row], *, header: bool) -> None:
+        table = Table(
+            show_header=header,
+            header_style=self.header_style,
+            show_edge=False,
+            pad_edge=False,
+        )
+        for column, width in zip(self.columns, self.widths):
+            table.add_column(
+                column.header,
+                style=column.style,
+                justify=column.justify,  # type: ignore[arg-type]
+                width=width,
+                no_wrap=True,
+                overflow="ellipsis",
+            )
+        for row in rows:
+            table.add_row(*row)
+        self.console.print(table)
+        self.rows_shown += len(rows)
+
+    def _continue(self) -> bool:
+        answer = self.console.input(
+            f"[dim]-- {self.rows_shown} rows, Enter for more, q to quit --[/] "
+        )
+        return answer.strip().lower() not in {"q", "quit"}
+
+    def render(self, rows: Iterable[Row]) -> int:
+        """Print all rows (or until the reader quits); return the count shown."""
+        source = _Prefetcher(rows, capacity=self.page_size * 4)
+        on_page = 0
+        pending: List[Row] = []
+        try:
+            for row in source.rows(FLUSH_AFTER):
+                if row is None:
+                    # The source stalled; show what has arrived so far. Without
+                    # pages the widths are fixed by the first flush, so that one
+                    # waits for a full screen of rows.
+                    if pending and (self.interactive or self.widths):
+                        self._flush(pending, new_page=on_page == 0)
+                        on_page += len(pending)
+                        pending = []
+                    continue
+
+                self._observe(row)
+                pending.append(row)
+                if on_page + len(pending) >= self.page_size:
+                    self._flush(pending, new_page=on_page == 0)
+                    pending, on_page = [], 0
+                    if self.interactive and not self._continue():
+                        break
+
+            if pending:
+                self._flush(pending, new_page=on_page == 0)
+        finally:
+            source.close()
+        return self.rows_shown
+
+    def _flush(self, rows: List[Row], *, new_page: bool) -> None:
+        if not self.interactive:
+            new_page = not self.widths
+        if new_page or not self.widths:
+            self._update_widths()
+        self._print(rows, header=new_page)
+
+
+class _Prefetcher:
+    """Pull rows from an iterator on a daemon thread into a bounded queue.
+
+    After :meth:`close` the thread closes the iterator itself, since a
+    generator cannot be closed from another thread while it is running.
+    """
+
+    def __init__(self, rows: Iterable[Row], *, capacity: int) -> None:
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=capacity)
+        self._closed = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, args=(iter(rows),), daemon=True)
+        self._thread.start()
+
+    def _put(self, item: object) -> bool:
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, rows: Iterator[Row]) -> None:
+        try:
+            for row in rows:
+                if not self._put(row):
+                    break
+            else:
+                self._put(_DONE)
+        except BaseException as exc:  # noqa: BLE001 - re-raised by the reader
+            self._error = exc
+            self._put(_DONE)
+        finally:
+            close = getattr(rows, "close", None)
+            if close is not None and self._closed.is_set():
+                try:
+                    close()
+                except Exception:  # noqa: BLE001 - nobody is reading anymore
+                    pass
+
+    def rows(self, stall: float) -> Iterator[Optional[Row]]:
+        """Yield rows, or ``None`` whenever none arrived within ``stall`` seconds."""
+        while True:
+            try:
+                item = self._queue.get(timeout=stall)
+            except queue.Empty:
+                yield None
+                continue
+            if item is _DONE:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item  # type: ignore[misc]
+
+    def close(self) -> None:
+        self._closed.set()
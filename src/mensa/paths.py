@@ -0,0 +1,34 @@
+"""Filesystem locations for cached and persisted data."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from pathlib import Path
+
+
+def cache_root() -> str:
+    """Return the mensa cache root without creating it.
+
+    The root honours ``MENSA_CACHE_DIR`` and falls back to
+    ``$XDG_CACHE_HOME/mensa`` or ``~/.cache/mensa``. Only ``os`` is used so
+    that the ``mensa status`` fast path stays cheap to import.
+    """
+    root = os.environ.get("MENSA_CACHE_DIR")
+    if root:
+        return root
+    xdg = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(xdg, "mensa")
+
+
+def cache_dir(*parts: str) -> Path:
+    """Return (and create) a directory below the mensa cache root."""
+    from pathlib import Path
+
+    path = Path(cache_root()).joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -2,13 +2,20 @@
 
 from __future__ import annotations
 
-from typing import Sequence
+from typing import TYPE_CHECKING, Iterable, Optional, Sequence
 
 from rich.console import Console
 from rich.table import Table
 
 from mensa.models import Meal
+from mensa.paging import ColumnSpec, PagedTable
 from mensa.providers.types import MensaSite
+from mensa.ratelimit import BucketState, HostLimit
+from mensa.stats import PRICE_TIERS, MealStats
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from mensa.loadtest import LoadReport
+    from mensa.similarity import Dish, DishCluster
 
 
 def create_meal_table(
@@ -60,6 +67,99 @@ def create_meal_table(
     return table
 
 
+MATCH_COLUMNS = (
+    ColumnSpec("Mensa", style="blue", max_width=32),
+    ColumnSpec("Category", style="cyan", max_width=24),
+    ColumnSpec("Dish", style="white", min_width=12, max_width=80, ratio=2),
+    ColumnSpec("Dietary", style="magenta", max_width=24),
+    ColumnSpec("Nutrition", style="yellow", max_width=10),
+    ColumnSpec("Allergens", style="red", max_width=30),
+    ColumnSpec("Price", style="green", justify="right", min_width=5, max_width=8),
+)
+
+
+def match_row(site: MensaSite, meal: Meal, price_tier: str = "student") -> tuple[str, ...]:
+    return (
+        site.name,
+        meal.category,
+        meal.name,
+        ", ".join(meal.dietary.labels),
+        meal.nutrition.traffic_light or "",
+        ", ".join(meal.allergens.codes),
+        _format_price(meal, price_tier),
+    )
+
+
+def create_match_table(
+    matches: Iterable[tuple[MensaSite, Meal]], *, price_tier: str = "student"
+) -> Table:
+    table = Table(show_header=True, header_style="bold green")
+    for column in MATCH_COLUMNS:
+        table.add_column(column.header, style=column.style, justify=column.justify)
+
+    for site, meal in matches:
+        table.add_row(*match_row(site, meal, price_tier))
+
+    return table
+
+
+def print_matches(
+    console: Console,
+    matches: Iterable[tuple[MensaSite, Meal]],
+    *,
+    price_tier: str = "student",
+    interactive: Optional[bool] = None,
+) -> int:
+    """Print matches page by page as they arrive; return the number shown."""
+    rows = (match_row(site, meal, price_tier) for site, meal in matches)
+    return PagedTable(console, MATCH_COLUMNS, interactive=interactive).render(rows)
+
+
+def _sites(keys: Iterable[str], limit: int = 3) -> str:
+    keys = sorted(keys)
+    text = ", ".join(keys[:limit])
+    return f"{text} (+{len(keys) - limit})" if len(keys) > limit else text
+
+
+def create_similar_dish_table(matches: Iterable[tuple[float, "Dish"]]) -> Table:
+    table = Table(show_header=True, header_style="bold green")
+    table.add_column("Similarity", style="green", justify="right")
+    table.add_column("Dish", style="white")
+    table.add_column("Days", justify="right")
+    table.add_column("Last served", style="cyan")
+    table.add_column("Mensas", style="blue")
+
+    for score, dish in matches:
+        table.add_row(
+            f"{score:.0%}",
+            dish.name,
+            str(len(dish.dates)),
+            max(dish.dates, default=""),
+            _sites(dish.sites),
+        )
+
+    return table
+
+
+def create_dish_cluster_table(clusters: Iterable["DishCluster"]) -> Table:
+    table = Table(show_header=True, header_style="bold green")
+    table.add_column("Dish", style="white")
+    table.add_column("Days", justify="right")
+    table.add_column("Mensas", style="blue")
+    table.add_column("Spellings", style="dim")
+
+    for cluster in clusters:
+        spellings = sorted({dish.name for dish in cluster.dishes} - {cluster.name})
+        table.add_row(
+            cluster.name,
+            str(cluster.days),
+            _sites(cluster.sites),
+            "; ".join(spellings[:3]) + (" …" if len(spellings) > 3 else ""),
+        )
+
+    return table
+
+
 def print_list(console: Console, mensen: dict[str, MensaSite]) -> Table:
     console.print("\n[bold blue]Available Mensas:[/]")
 
@@ -76,29 +176,142 @@ def print_list(console: Console, mensen: dict[str, MensaSite]) -> Table:
     return table
 
 
+def create_distance_table(results: Iterable[tuple[float, MensaSite]]) -> Table:
+    table = Table(show_header=True, header_style="bold green")
+    table.add_column("Distance", justify="right")
+    table.add_column("ID")
+    table.add_column("Mensa")
+    table.add_column("City")
+
+    for distance, site in results:
+        table.add_row(f"{distance:.2f} km", site.key, site.name, site.city or "")
+
+    return table
+
+
+def create_limits_table(
+    limits: dict[str, HostLimit], metrics: dict[str, Optional[BucketState]]
+) -> Table:
+    table = Table(show_header=True, header_style="bold green")
+    table.add_column("Host")
+    table.add_column("Rate", justify="right")
+    table.add_column("Burst", justify="right")
+    table.add_column("Requests", justify="right")
+    table.add_column("Delayed", justify="right")
+    table.add_column("Mean wait", justify="right")
+    table.add_column("Max wait", justify="right")
+
+    for host, limit in sorted(limits.items()):
+        state = metrics.get(host)
+        if state is None or not state.requests:
+            usage = ["0", "0", "-", "-"]
+        else:
+            usage = [
+                str(state.requests),
+                str(state.waited),
+                f"{state.wait_total / state.requests:.3f}s",
+                f"{state.wait_max:.3f}s",
+            ]
+        table.add_row(host, f"{limit.rate:g}/s", str(limit.burst), *usage)
+
+    return table
+
+
+def create_load_report_table(reports: Iterable[LoadReport]) -> Table:
+    table = Table(show_header=True, header_style="bold green")
+    table.add_column("Scenario")
+    table.add_column("Requests", justify="right")
+    table.add_column("OK", justify="right")
+    table.add_column("req/s", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("p99", justify="right")
+    table.add_column("Errors", style="red")
+    table.add_column("Server statuses")
+
+    def millis(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.1f} ms"
+
+    for report in reports:
+        table.add_row(
+            report.label,
+            str(report.requests),
+            str(report.ok),
+            f"{report.throughput:.1f}",
+            millis(report.latency(0.50)),
+            millis(report.latency(0.95)),
+            millis(report.latency(0.99)),
+            ", ".join(f"{name}: {count}" for name, count in report.errors.most_common()),
+            ", ".join(
+                f"{status}: {count}"
+                for status, count in sorted(report.server_statuses.items())
+            ),
+        )
+
+    return table
+
+
 def print_summary(console: Console, meals: Sequence[Meal]) -> None:
     console.print("\n[bold blue]Summary Statistics:[/]")
 
-    categories = {meal.category for meal in meals}
-    vegetarian_count = sum(1 for meal in meals if meal.dietary.vegetarian)
-    vegan_count = sum(1 for meal in meals if meal.dietary.vegan)
+    stats = MealStats.from_meals(meals)
 
-    console.print(f"• Total meals: {len(meals)}")
-    console.print(f"• Categories: {', '.join(sorted(categories))}")
-    console.print(f"• Vegetarian options: {vegetarian_count}")
-    console.print(f"• Vegan options: {vegan_count}")
-
-    traffic_lights: dict[str, int] = {}
-    for meal in meals:
-        light = meal.nutrition.traffic_light or "Unknown"
-        traffic_lights[light] = traffic_lights.get(light, 0) + 1
+    console.print(f"• Total meals: {stats.total}")
+    console.print(f"• Categories: {', '.join(sorted(stats.categories))}")
+    console.print(f"• Vegetarian options: {stats.vegetarian}")
+    console.print(f"• Vegan options: {stats.vegan}")
 
-    if traffic_lights:
+    if stats.traffic_lights:
         console.print("• Nutrition distribution:")
-        for light, count in traffic_lights.items():
+        for light, count in stats.traffic_lights.items():
             console.print(f"  - {light}: {count}")
 
 
+def print_stats(
+    console: Console, stats: MealStats, *, days: int, sites: int
+) -> None:
+    console.print(
+        f"\n[bold blue]Statistics over {days} day(s) and {sites} site(s):[/]"
+    )
+
+    if not stats.total:
+        console.print("[yellow]No data available for this range.[/]")
+        return
+
+    console.print(f"• Total meals: {stats.total}")
+    console.print(
+        f"• Vegetarian share: {stats.vegetarian / stats.total:.1%} "
+        f"({stats.vegetarian})"
+    )
+    console.print(f"• Vegan share: {stats.vegan / stats.total:.1%} ({stats.vegan})")
+
+    prices = Table(show_header=True, header_style="bold green")
+    prices.add_column("Tier")
+    for label in ("n", "mean", "p25", "p50", "p75", "p90"):
+        prices.add_column(label, justify="right")
+
+    for tier in PRICE_TIERS:
+        sketch = stats.prices[tier]
+        if not sketch.count:
+            continue
+        values = [sketch.mean()] + [
+            sketch.quantile(q) for q in (0.25, 0.5, 0.75, 0.9)
+        ]
+        prices.add_row(
+            tier, str(sketch.count), *(f"€{value:.2f}" for value in values)
+        )
+    console.print(prices)
+
+    console.print("• Nutrition distribution:")
+    for light, count in stats.traffic_lights.most_common():
+        console.print(f"  - {light}: {count / stats.total:.1%} ({count})")
+
+    if stats.allergens:
+        console.print("• Most frequent allergens:")
+        for allergen, count in stats.allergens.most_common(10):
+            console.print(f"  - {allergen}: {count / stats.total:.1%} ({count})")
+
+
 def _format_price(meal: Meal, tier: str) -> str:
     pricing = meal.pricing
     if not pricing.is_available:
@@ -0,0 +1,334 @@
+"""Site catalogue loaded from ``sites.json`` with a fuzzy lookup index."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import astuple, dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from mensa import paths
+from mensa.geo import KDTree, nearest_sites
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = Path(__file__).with_name("sites.json")
+
+# Bump whenever the serialized layout below changes.
+INDEX_VERSION = 3
+
+_UMLAUT_SPELLINGS = re.compile(r"(?<=[aou])e")
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Fold case, diacritics, umlaut spellings and separators.
+
+    ``"Mensa HU Süd"``, ``"hu_sued"`` and ``"HU-Sud"`` all normalize to
+    comparable strings.
+    """
+    # casefold() already maps "ß" to "ss"; NFKD splits "ü" into "u" plus a
+    # combining mark, and "ue"-style spellings are folded the same way.
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _UMLAUT_SPELLINGS.sub("", text)
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class SiteRecord:
+    """Provider-independent catalogue entry."""
+
+    key: str
+    name: str
+    url: str
+    provider: str
+    city: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+
+_RECORD_FIELDS = tuple(field.name for field in fields(SiteRecord))
+
+
+class Catalog:
+    """Immutable site catalogue with exact, prefix and trigram lookups.
+
+    Every record contributes one searchable document per field (key, name,
+    city). Postings map trigrams to document ids so a lookup only touches
+    documents that share at least one trigram with the query.
+    """
+
+    FIELDS = ("key", "name", "city")
+
+    def __init__(
+        self,
+        records: Sequence[SiteRecord],
+        documents: Sequence[Tuple[int, str]],
+        postings: Dict[str, array],
+        prefixes: Sequence[Tuple[str, int]],
+        sizes: Optional[array] = None,
+        locations: Optional[KDTree[int]] = None,
+    ) -> None:
+        self.records = tuple(records)
+        if locations is None:
+            locations = KDTree(
+                (record.latitude, record.longitude, index)
+                for index, record in enumerate(self.records)
+                if record.latitude is not None and record.longitude is not None
+            )
+        # Spatial index over record positions, stored with the cached index
+        # so `mensa near` does not rebuild it on every run.
+        self.locations = locations
+        self._documents = documents
+        if sizes is None:
+            sizes = array("H", (len(trigrams(text)) for _, text in documents))
+        self._sizes = sizes
+        self._postings = postings
+        self._prefixes = prefixes
+        self._by_key = {record.key: index for index, record in enumerate(records)}
+        self._by_normalized: Optional[Dict[str, List[int]]] = None
+
+    @classmethod
+    def build(cls, records: Sequence[SiteRecord]) -> "Catalog":
+        documents: List[Tuple[int, str]] = []
+        postings: Dict[str, List[int]] = {}
+
+        for index, record in enumerate(records):
+            for field in cls.FIELDS:
+                value = getattr(record, field)
+                if not value:
+                    continue
+                text = normalize(value)
+                doc_id = len(documents)
+                documents.append((index, text))
+                for gram in trigrams(text):
+                    postings.setdefault(gram, []).append(doc_id)
+
+        prefixes = sorted((text, index) for index, text in documents)
+        return cls(
+            records,
+            documents,
+            {gram: array("I", ids) for gram, ids in postings.items()},
+            prefixes,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain JSON-compatible form of the compiled index.
+
+        Postings are concatenated into one id array stored as base64, which
+        loads several times faster than nested JSON lists.
+        """
+        grams = sorted(self._postings)
+        counts = array("I", (len(self._postings[gram]) for gram in grams))
+        ids = array("I")
+        for gram in grams:
+            ids.extend(self._postings[gram])
+        return {
+            "fields": _RECORD_FIELDS,
+            "records": [astuple(record) for record in self.records],
+            "documents": self._documents,
+            "sizes": _encode(self._sizes),
+            "grams": grams,
+            "counts": _encode(counts),
+            "ids": _encode(ids),
+            "prefixes": self._prefixes,
+            "locations": self.locations.to_dict(),
+            "located": [*self.locations.items],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Catalog":
+        counts = _decode("I", data["counts"])
+        ids = _decode("I", data["ids"])
+        if len(counts) != len(data["grams"]) or sum(counts) != len(ids):
+            raise ValueError("Inconsistent catalogue postings")
+
+        postings: Dict[str, array] = {}
+        start = 0
+        for gram, count in zip(data["grams"], counts):
+            postings[gram] = ids[start : start + count]
+            start += count
+
+        if data["fields"] != [*_RECORD_FIELDS]:
+            raise ValueError("Catalogue index has a different record layout")
+        # Documents stay [index, text] lists; only prefixes are bisected and
+        # must be tuples.
+        documents = data["documents"]
+        sizes = _decode("H", data["sizes"])
+        if len(sizes) != len(documents):
+            raise ValueError("Inconsistent catalogue documents")
+        records = [SiteRecord(*record) for record in data["records"]]
+        located = data["located"]
+        if any(not 0 <= index < len(records) for index in located):
+            raise ValueError("Inconsistent catalogue locations")
+        return cls(
+            records,
+            documents,
+            postings,
+            [(text, index) for text, index in data["prefixes"]],
+            sizes,
+            KDTree.from_dict(data["locations"], located),
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        *,
+        max_distance_km: Optional[float] = None,
+    ) -> List[Tuple[float, SiteRecord]]:
+        """Return up to ``k`` ``(distance_km, record)`` pairs, closest first."""
+        return [
+            (distance, self.records[index])
+            for distance, index in nearest_sites(
+                self.locations, latitude, longitude, k, max_distance_km=max_distance_km
+            )
+        ]
+
+    def get(self, key: str) -> Optional[SiteRecord]:
+        index = self._by_key.get(key)
+        return None if index is None else self.records[index]
+
+    def resolve(self, query: str) -> Optional[SiteRecord]:
+        """Return the record for an exact or unambiguous normalized key."""
+        record = self.get(query)
+        if record is not None:
+            return record
+
+        if self._by_normalized is None:
+            self._by_normalized = {}
+            for index, record in enumerate(self.records):
+                self._by_normalized.setdefault(normalize(record.key), []).append(index)
+
+        candidates = self._by_normalized.get(normalize(query), [])
+        if len(candidates) == 1:
+            return self.records[candidates[0]]
+        return None
+
+    def search(
+        self, query: str, *, limit: int = 5, threshold: float = 0.3
+    ) -> List[Tuple[float, SiteRecord]]:
+        """Rank records by similarity to ``query``, best first.
+
+        Prefix matches on any field score 1.0; otherwise the score is the
+        Dice coefficient of trigram sets, taking the best field per record.
+        """
+        text = normalize(query)
+        if not text:
+            return []
+
+        scores: Dict[int, float] = {}
+
+        start = bisect_left(self._prefixes, (text, -1))
+        for prefix, index in self._prefixes[start:]:
+            if not prefix.startswith(text):
+                break
+            scores[index] = 1.0
+
+        grams = trigrams(text)
+        # Trigrams shared by a large part of the catalogue (e.g. from "Mensa")
+        # barely change the ranking but dominate the cost, so they are skipped
+        # unless nothing else is left to match on.
+        common = max(64, len(self._documents) // 4)
+        selective = [
+            gram for gram in grams if len(self._postings.get(gram, ())) <= common
+        ]
+        shared: Counter = Counter()
+        for gram in selective or grams:
+            shared.update(self._postings.get(gram, ()))
+
+        for doc_id, count in shared.items():
+            index = self._documents[doc_id][0]
+            score = 2 * count / (len(grams) + self._sizes[doc_id])
+            if score > scores.get(index, 0.0):
+                scores[index] = score
+
+        ranked = sorted(
+            (item for item in scores.items() if item[1] >= threshold),
+            key=lambda item: (-item[1], self.records[item[0]].key),
+        )
+        return [(score, self.records[index]) for index, score in ranked[:limit]]
+
+
+def _encode(values: array) -> str:
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _decode(typecode: str, text: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(text, validate=True))
+    return values
+
+
+def _read_records(path: Path) -> List[SiteRecord]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return [SiteRecord(**entry) for entry in data["sites"]]
+
+
+def _index_path(files: Sequence[Path]) -> Path:
+    identity = hashlib.sha1(str(INDEX_VERSION).encode("utf-8"))
+    for path in files:
+        stat = path.stat()
+        identity.update(f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    return paths.cache_dir("catalog") / f"{files[0].stem}-{identity.hexdigest()[:16]}.json"
+
+
+def load_catalog(path: Path = DATA_FILE, *extra: Path) -> Catalog:
+    """Load a catalogue, reusing the precompiled index cached for its files.
+
+    Records from ``extra`` files are appended; later files win on duplicate
+    keys. The cache file name encodes each data file's path, size and mtime,
+    so edits to the JSON invalidate it automatically. The index is stored as
+    plain JSON, so a tampered cache file can at worst produce wrong lookups,
+    never run code. Any problem with the cache falls back to rebuilding from
+    the source files.
+    """
+    files = [path, *extra]
+    try:
+        index_path: Optional[Path] = _index_path(files)
+    except OSError as exc:
+        logger.debug("Catalogue index cache unavailable: %s", exc)
+        index_path = None
+
+    if index_path is not None and index_path.exists():
+        try:
+            return Catalog.from_dict(json.loads(index_path.read_text(encoding="utf-8")))
+        except Exception as exc:  # noqa: BLE001 - a broken cache is rebuilt
+            logger.debug("Ignoring catalogue index %s: %s", index_path, exc)
+
+    records: Dict[str, SiteRecord] = {}
+    for file in files:
+        records.update((record.key, record) for record in _read_records(file))
+    catalog = Catalog.build([*records.values()])
+
+    if index_path is not None:
+        try:
+            tmp = index_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(
+                json.dumps(catalog.to_dict(), ensure_ascii=False, separators=(",", ":")),
+                encoding="utf-8",
+            )
+            os.replace(tmp, index_path)
+        except OSError as exc:
+            logger.debug("Could not write catalogue index %s: %s", index_path, exc)
+
+    return catalog
@@ -0,0 +1,246 @@
+"""Provider for OpenMensa-style JSON menu APIs.
+
+A site's ``url`` is its canteen resource, e.g.
+``https://openmensa.org/api/v2/canteens/42``. Sites sharing an API base are
+fetched together: :func:`fetch_many` first asks the aggregate endpoint
+
+    GET {base}/meals?canteens=1,2,3&start=YYYY-MM-DD&end=YYYY-MM-DD
+
+which answers ``{"canteens": {"1": [<day>, ...], ...}}``. APIs without it
+(404/405/501) are remembered and served per canteen through
+``GET {base}/canteens/{id}/meals?start=...``, which still covers all
+requested days in one call. A ``<day>`` is
+``{"date": ..., "closed": bool, "meals": [<meal>, ...]}`` and a ``<meal>``
+follows OpenMensa v2 (``name``, ``category``, ``prices``, ``notes``).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import requests
+
+from mensa import http
+from mensa.models import AllergenInfo, DietaryInfo, Meal, NutritionInfo, Pricing
+from mensa.providers.stw_berlin import constants
+from mensa.providers.types import MealFilter, MensaSite, ParseResult
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = "openmensa"
+
+_CANTEEN_URL = re.compile(r"^(?P<base>.+)/canteens/(?P<id>\d+)/?$")
+
+# Aggregate endpoints that turned out not to exist, per API base.
+_UNBATCHED: Set[str] = set()
+
+_PRICE_KEYS = (("student", "students"), ("employee", "employees"), ("guest", "others"))
+
+_ALLERGEN_NAMES = {
+    info["name"].casefold(): (code, info)
+    for code, info in constants.ALLERGEN_ADDITIVES.items()
+}
+
+_TRAFFIC_LIGHTS = {
+    info["name"].casefold(): info for info in constants.TRAFFIC_LIGHT_MAP.values()
+}
+
+
+def split_canteen_url(url: str) -> Tuple[str, str]:
+    """Return ``(api_base, canteen_id)`` for a canteen URL."""
+    match = _CANTEEN_URL.match(url)
+    if match is None:
+        raise ValueError(f"Not an OpenMensa canteen URL: {url}")
+    return match.group("base"), match.group("id")
+
+
+def _pricing(prices: Mapping[str, Any]) -> Pricing:
+    values = {tier: prices.get(key) for tier, key in _PRICE_KEYS}
+    available = [value for value in values.values() if value is not None]
+    if not available:
+        return Pricing(raw="", is_available=False)
+
+    raw = "€ " + "/".join(
+        f"{value:.2f}".replace(".", ",") for value in values.values() if value is not None
+    )
+    return Pricing(raw=raw, is_available=True, **values)
+
+
+def _classify_notes(
+    notes: Iterable[str],
+) -> Tuple[AllergenInfo, DietaryInfo, NutritionInfo]:
+    codes: List[str] = []
+    readable: List[str] = []
+    additives: List[str] = []
+    allergens: List[str] = []
+    labels: List[str] = []
+    nutrition = NutritionInfo()
+    vegetarian = vegan = False
+
+    for note in notes:
+        folded = note.strip().casefold()
+        known = _ALLERGEN_NAMES.get(folded)
+        if known is not None:
+            code, info = known
+            codes.append(code)
+            readable.append(info["description"])
+            (additives if info["type"] == "additive" else allergens).append(info["name"])
+            continue
+
+        light = _TRAFFIC_LIGHTS.get(folded)
+        if light is not None:
+            nutrition.traffic_light = light["name"]
+            nutrition.traffic_light_description = light["description"]
+            continue
+
+        if "vegan" in folded:
+            vegan = vegetarian = True
+            labels.append("Vegan")
+        elif "vegetar" in folded:
+            vegetarian = True
+            labels.append("Vegetarisch")
+        else:
+            labels.append(note.strip())
+
+    return (
+        AllergenInfo(codes=codes, readable=readable, additives=additives, allergens=allergens),
+        DietaryInfo(labels=labels, vegetarian=vegetarian, vegan=vegan),
+        nutrition,
+    )
+
+
+def _build_meal(data: Mapping[str, Any], where: Optional[MealFilter]) -> Optional[Meal]:
+    name = (data.get("name") or "").strip()
+    if not name:
+        logger.warning("Empty meal name found")
+        return None
+
+    known: Dict[str, Any] = {"category": (data.get("category") or "").strip()}
+    known["pricing"] = _pricing(data.get("prices") or {})
+    if where is not None and where.evaluate(known) is False:
+        return None
+
+    allergens, dietary, nutrition = _classify_notes(data.get("notes") or ())
+    known.update(allergens=allergens, dietary=dietary, nutrition=nutrition, name=name)
+    if where is not None and where.evaluate(known) is not True:
+        return None
+
+    return Meal(
+        category=known["category"],
+        name=name,
+        pricing=known["pricing"],
+        nutrition=nutrition,
+        dietary=dietary,
+        allergens=allergens,
+    )
+
+
+def _day_result(
+    day: Optional[Mapping[str, Any]], date: str, url: str, where: Optional[MealFilter]
+) -> ParseResult:
+    if day is None:
+        return ParseResult(meals=[], menu_date=date, source_url=url, warnings=["No menu published"])
+    if day.get("closed"):
+        return ParseResult(meals=[], menu_date=date, source_url=url, warnings=["Closed"])
+
+    meals = [
+        meal
+        for meal in (_build_meal(item, where) for item in day.get("meals") or ())
+        if meal is not None
+    ]
+    return ParseResult(meals=meals, menu_date=date, source_url=url)
+
+
+def parse_menu(html: str, *, where: Optional[MealFilter] = None) -> ParseResult:
+    """Parse a single day: either a list of meals or a ``<day>`` object."""
+    data = json.loads(html)
+    if isinstance(data, list):
+        data = {"meals": data}
+    return _day_result(data, data.get("date"), None, where)
+
+
+def _fetch_aggregate(
+    base: str, ids: Sequence[str], dates: Sequence[str]
+) -> Optional[Dict[str, List[Mapping[str, Any]]]]:
+    if base in _UNBATCHED:
+        return None
+    try:
+        data = http.fetch_json(
+            f"{base}/meals",
+            params={"canteens": ",".join(ids), "start": min(dates), "end": max(dates)},
+        )
+    except requests.HTTPError as exc:
+        status = exc.response.status_code if exc.response is not None else None
+        if status in {404, 405, 501}:
+            logger.debug("No aggregate endpoint at %s; fetching per canteen", base)
+            _UNBATCHED.add(base)
+            return None
+        raise
+    return {str(key): days for key, days in (data.get("canteens") or {}).items()}
+
+
+def _fetch_canteen(base: str, canteen: str, dates: Sequence[str]) -> List[Mapping[str, Any]]:
+    data = http.fetch_json(
+        f"{base}/canteens/{canteen}/meals",
+        params={"start": min(dates), "end": max(dates)},
+    )
+    return data if isinstance(data, list) else []
+
+
+def fetch_many(
+    sites: Sequence[MensaSite],
+    dates: Sequence[str],
+    *,
+    where: Optional[MealFilter] = None,
+) -> Dict[Tuple[str, str], Union[ParseResult, Exception]]:
+    """Fetch ``dates`` for all ``sites`` with one request per API base.
+
+    Returns an entry for every ``(site.key, date)`` pair; days without a
+    published menu yield an empty result with a warning. When canteens are
+    fetched one by one, a canteen whose request fails gets the exception
+    as its entry while the others are still returned.
+    """
+    groups: Dict[str, List[Tuple[MensaSite, str]]] = {}
+    for site in sites:
+        base, canteen = split_canteen_url(site.url)
+        groups.setdefault(base, []).append((site, canteen))
+
+    results: Dict[Tuple[str, str], Union[ParseResult, Exception]] = {}
+    for base, members in groups.items():
+        ids = sorted({canteen for _, canteen in members})
+        by_canteen: Dict[str, Union[List[Mapping[str, Any]], Exception]] = {}
+        aggregate = _fetch_aggregate(base, ids, dates)
+        if aggregate is not None:
+            by_canteen.update(aggregate)
+        else:
+            for canteen in ids:
+                try:
+                    by_canteen[canteen] = _fetch_canteen(base, canteen, dates)
+                except (requests.RequestException, ValueError) as exc:
+                    logger.debug("Fetching canteen %s at %s failed: %s", canteen, base, exc)
+                    by_canteen[canteen] = exc
+
+        for site, canteen in members:
+            found = by_canteen.get(canteen, [])
+            if isinstance(found, Exception):
+                results.update(((site.key, date), found) for date in dates)
+                continue
+            days = {day.get("date"): day for day in found}
+            for date in dates:
+                results[(site.key, date)] = _day_result(days.get(date), date, site.url, where)
+
+    return results
@@ -0,0 +1,95 @@
+"""Serve recorded OpenMensa fixtures from a local stand-in server."""
+
+from __future__ import annotations
+
+import datetime
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from mensa.standin import Document, StandInServer
+
+FIXTURE_DIR = Path(__file__).with_name("fixtures")
+MEALS_FIXTURE = FIXTURE_DIR / "meals.json"
+SITES_FIXTURE = FIXTURE_DIR / "sites.json"
+
+Days = List[Dict[str, Any]]
+
+
+def load_fixture(
+    path: Path = MEALS_FIXTURE, *, start: Optional[str] = None
+) -> Dict[str, Days]:
+    """Load recorded days per canteen.
+
+    With ``start``, dates are shifted so the earliest recorded day falls on
+    ``start`` while gaps between days are kept.
+    """
+    canteens: Dict[str, Days] = json.loads(path.read_text(encoding="utf-8"))["canteens"]
+    if start is None:
+        return canteens
+
+    dates = [day["date"] for days in canteens.values() for day in days]
+    if not dates:
+        return canteens
+    offset = datetime.date.fromisoformat(start) - datetime.date.fromisoformat(min(dates))
+    return {
+        canteen: [
+            {
+                **day,
+                "date": (datetime.date.fromisoformat(day["date"]) + offset).isoformat(),
+            }
+            for day in days
+        ]
+        for canteen, days in canteens.items()
+    }
+
+
+def _in_range(days: Days, query: Dict[str, List[str]]) -> Days:
+    start = query.get("start", [""])[0]
+    end = query.get("end", [""])[0]
+    return [
+        day
+        for day in days
+        if (not start or day["date"] >= start) and (not end or day["date"] <= end)
+    ]
+
+
+def _json(data: Any) -> Document:
+    return Document(json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json")
+
+
+def serve(
+    server: StandInServer,
+    canteens: Optional[Dict[str, Days]] = None,
+    *,
+    base_path: str = "/api/v2",
+    aggregate: bool = True,
+) -> None:
+    """Register OpenMensa routes for ``canteens`` (default: the fixture).
+
+    Without ``aggregate`` only the per-canteen endpoint exists, which
+    exercises the provider's fallback path.
+    """
+    canteens = load_fixture() if canteens is None else canteens
+
+    if aggregate:
+
+        def meals(query: Dict[str, List[str]]) -> Document:
+            wanted = ",".join(query.get("canteens", [])).split(",")
+            return _json(
+                {
+                    "canteens": {
+                        canteen: _in_range(canteens[canteen], query)
+                        for canteen in wanted
+                        if canteen in canteens
+                    }
+                }
+            )
+
+        server.add_route(f"{base_path}/meals", meals)
+
+    for canteen, days in canteens.items():
+        server.add_route(
+            f"{base_path}/canteens/{canteen}/meals",
+            lambda query, days=days: _json(_in_range(days, query)),
+        )
@@ -4,13 +4,13 @@ from __future__ import annotations
 
 import logging
 import re
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from bs4 import BeautifulSoup, Tag
 
 from mensa.models import AllergenInfo, DietaryInfo, Meal, NutritionInfo, Pricing
 from mensa.providers.stw_berlin import constants
-from mensa.providers.types import ParseResult
+from mensa.providers.types import MealFilter, ParseResult
 
 logger = logging.getLogger(__name__)
 
@@ -129,7 +129,34 @@ def _parse_icons(meal_element: Tag) -> Tuple[NutritionInfo, DietaryInfo]:
     return nutrition, dietary
 
 
-def _parse_meal(meal_element: Tag) -> Optional[Meal]:
+def _rejected(where: Optional[MealFilter], known: Dict[str, Any], field: str) -> bool:
+    return where is not None and field in where.fields and where.evaluate(known) is False
+
+
+def _parse_meal(
+    meal_element: Tag, category: str = "", where: Optional[MealFilter] = None
+) -> Optional[Meal]:
+    # Cheap fields are parsed and checked first so that meals ruled out by
+    # ``where`` are dropped before the remaining fields are extracted.
+    known: Dict[str, Any] = {"category": category}
+
+    allergen_codes_raw = _get_attribute(meal_element, "data-kennz", "")
+    allergens = known["allergens"] = _parse_allergen_codes(allergen_codes_raw)
+    if _rejected(where, known, "allergens"):
+        return None
+
+    price_element = meal_element.find("div", class_="text-right")
+    price_text = _get_text(price_element)
+    pricing = known["pricing"] = _parse_price_string(price_text)
+    if _rejected(where, known, "pricing"):
+        return None
+
+    nutrition, dietary = _parse_icons(meal_element)
+    known["nutrition"] = nutrition
+    known["dietary"] = dietary
+    if where is not None and where.evaluate(known) is False:
+        return None
+
     name_element = meal_element.find("span", class_="bold")
     if name_element is None:
         logger.warning("No name element found in meal")
@@ -140,17 +167,12 @@ def _parse_meal(meal_element: Tag) -> Optional[Meal]:
         logger.warning("Empty meal name found")
         return None
 
-    allergen_codes_raw = _get_attribute(meal_element, "data-kennz", "")
-    allergens = _parse_allergen_codes(allergen_codes_raw)
-
-    price_element = meal_element.find("div", class_="text-right")
-    price_text = _get_text(price_element)
-    pricing = _parse_price_string(price_text)
-
-    nutrition, dietary = _parse_icons(meal_element)
+    known["name"] = name
+    if where is not None and where.evaluate(known) is not True:
+        return None
 
     return Meal(
-        category="",
+        category=category,
         name=name,
         pricing=pricing,
         nutrition=nutrition,
@@ -159,7 +181,7 @@ def _parse_meal(meal_element: Tag) -> Optional[Meal]:
     )
 
 
-def parse_menu(html: str) -> ParseResult:
+def parse_menu(html: str, *, where: Optional[MealFilter] = None) -> ParseResult:
     soup = BeautifulSoup(html, "html.parser")
 
     speiseplan = soup.find("div", id="speiseplan")
@@ -176,12 +198,14 @@ def parse_menu(html: str) -> ParseResult:
             continue
 
         category = _get_text(group_name_element)
+        if _rejected(where, {"category": category}, "category"):
+            continue
+
         meal_elements = group.find_all("div", class_="splMeal", recursive=False)
 
         for meal_element in meal_elements:
-            meal = _parse_meal(meal_element)
+            meal = _parse_meal(meal_element, category, where)
             if meal:
-                meal.category = category
                 meals.append(meal)
 
     return ParseResult(meals=meals)
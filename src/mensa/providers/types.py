@@ -3,7 +3,20 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Iterable, List, Optional, Protocol, runtime_checkable
+from typing import (
+    TYPE_CHECKING,
+    AbstractSet,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+    runtime_checkable,
+)
 
 if TYPE_CHECKING:  # pragma: no cover - typing only
     from mensa.models import Meal
@@ -29,12 +42,50 @@ class ParseResult:
                 raise TypeError("ParseResult.meals must contain Meal instances")
 
 
+@runtime_checkable
+class MealFilter(Protocol):
+    """Predicate that parsers may evaluate on partially parsed meals.
+
+    ``known`` maps field names (``category``, ``name``, ``pricing``,
+    ``nutrition``, ``dietary``, ``allergens``) to the values parsed so far.
+    ``evaluate`` returns ``False`` once the meal is ruled out, ``True`` once it
+    definitely matches and ``None`` while undecided.
+    """
+
+    fields: AbstractSet[str]
+
+    def evaluate(self, known: Mapping[str, Any]) -> Optional[bool]:
+        ...
+
+
 @runtime_checkable
 class Parser(Protocol):
     """Callable contract for provider parsers."""
 
-    def __call__(self, html: str) -> ParseResult:
-        """Parse raw HTML and return structured meal data."""
+    def __call__(self, html: str, *, where: Optional[MealFilter] = None) -> ParseResult:
+        """Parse raw HTML and return structured meal data.
+
+        When ``where`` is given, only meals matching it are returned.
+        """
+        ...
+
+
+class BatchFetcher(Protocol):
+    """Fetches several sites and days at once for providers with bulk APIs.
+
+    Returns an entry keyed by ``(site.key, date)`` for every requested pair:
+    a :class:`ParseResult`, or the exception that prevented fetching that
+    site so one broken site does not fail the whole batch. Errors affecting
+    every site (e.g. the API being down) may still be raised.
+    """
+
+    def __call__(
+        self,
+        sites: Sequence["MensaSite"],
+        dates: Sequence[str],
+        *,
+        where: Optional[MealFilter] = None,
+    ) -> Dict[Tuple[str, str], Union[ParseResult, Exception]]:
         ...
 
 
@@ -48,3 +99,5 @@ class MensaSite:
     provider: str
     city: Optional[str]
     parser: Parser
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
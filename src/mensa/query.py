@@ -0,0 +1,335 @@
+"""Small predicate language for filtering meals across sites.
+
+Examples::
+
+    vegan and price < 3 and not allergen:nuts
+    (category:essen or category:aktion) and light:green
+    vegetarian and name:curry
+
+Terms are ``vegan``, ``vegetarian``, ``price <op> <number>``,
+``light:<colour>``, ``allergen:<name or code>``, ``category:<text>`` and
+``name:<text>``, combined with ``and``, ``or``, ``not`` and parentheses.
+
+A compiled :class:`Query` evaluates with three-valued logic over the meal
+fields known so far, which lets parsers reject a meal as soon as the fields
+parsed cheaply (category, allergen codes, price, icons) already rule it out.
+"""
+
+from __future__ import annotations
+
+import operator
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, FrozenSet, List, Mapping, Optional, Union
+
+from mensa.models import Meal
+
+ALLERGEN_ALIASES = {
+    "nuts": ("erdnüsse", "schalenfrüchte", "mandeln", "haselnuss", "walnuss", "kaschunuss"),
+    "peanuts": ("erdnüsse",),
+    "gluten": ("gluten", "weizen", "roggen", "gerste", "hafer", "dinkel", "kamut"),
+    "wheat": ("weizen",),
+    "milk": ("milch",),
+    "lactose": ("milch",),
+    "egg": ("eier",),
+    "eggs": ("eier",),
+    "fish": ("fisch",),
+    "soy": ("soja",),
+    "celery": ("sellerie",),
+    "mustard": ("senf",),
+    "sesame": ("sesam",),
+    "crustaceans": ("krebstiere",),
+    "molluscs": ("weichtiere",),
+    "lupin": ("lupinen",),
+    "sulphites": ("schwefeldioxid",),
+}
+
+LIGHT_ALIASES = {
+    "green": "grün",
+    "gruen": "grün",
+    "yellow": "gelb",
+    "red": "rot",
+}
+
+_COMPARISONS: Mapping[str, Callable[[float, float], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "=": operator.eq,
+    "!=": operator.ne,
+}
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<paren>[()])
+      | (?P<op><=|>=|!=|<|>|=|:)
+      | "(?P<quoted>[^"]*)"
+      | (?P<word>[^\s()<>=!:"]+)
+    )""",
+    re.VERBOSE,
+)
+
+
+class QueryError(ValueError):
+    """Raised when a query expression cannot be parsed."""
+
+
+@dataclass(frozen=True)
+class Term:
+    """Leaf predicate over a single meal field."""
+
+    field: str
+    test: Callable[[Any], bool]
+    text: str
+
+
+@dataclass(frozen=True)
+class Not:
+    operand: "Node"
+
+
+@dataclass(frozen=True)
+class BoolOp:
+    op: str
+    operands: tuple["Node", ...]
+
+
+Node = Union[Term, Not, BoolOp]
+
+
+def _evaluate(node: Node, known: Mapping[str, Any]) -> Optional[bool]:
+    """Kleene evaluation: ``None`` means undecided with the known fields."""
+    if isinstance(node, Term):
+        if node.field not in known:
+            return None
+        return bool(node.test(known[node.field]))
+
+    if isinstance(node, Not):
+        value = _evaluate(node.operand, known)
+        return None if value is None else not value
+
+    short_circuit = node.op == "or"
+    result: Optional[bool] = not short_circuit
+    for operand in node.operands:
+        value = _evaluate(operand, known)
+        if value is short_circuit:
+            return short_circuit
+        if value is None:
+            result = None
+    return result
+
+
+def _fields(node: Node) -> FrozenSet[str]:
+    if isinstance(node, Term):
+        return frozenset({node.field})
+    if isinstance(node, Not):
+        return _fields(node.operand)
+    return frozenset().union(*(_fields(operand) for operand in node.operands))
+
+
+class Query:
+    """Compiled predicate; see the module docstring for the syntax."""
+
+    def __init__(
+        self, root: Optional[Node], *, text: str = "", price_tier: str = "student"
+    ) -> None:
+        self.root = root
+        self.text = text
+        self.price_tier = price_tier
+        self.fields = _fields(root) if root is not None else frozenset()
+        # Equivalent queries share a key: the price tier changes what
+        # ``price`` compares against, spacing between tokens changes nothing.
+        self.cache_key = f"{price_tier}|{_canonical(text)}"
+
+    def evaluate(self, known: Mapping[str, Any]) -> Optional[bool]:
+        if self.root is None:
+            return True
+        return _evaluate(self.root, known)
+
+    def matches(self, meal: Meal) -> bool:
+        return self.evaluate(meal_fields(meal)) is True
+
+    def __repr__(self) -> str:
+        return f"Query({self.text!r})"
+
+
+def meal_fields(meal: Meal) -> dict[str, Any]:
+    return {
+        "category": meal.category,
+        "name": meal.name,
+        "pricing": meal.pricing,
+        "nutrition": meal.nutrition,
+        "dietary": meal.dietary,
+        "allergens": meal.allergens,
+    }
+
+
+def tier_price(meal: Meal, tier: str) -> Optional[float]:
+    return getattr(meal.pricing, tier, None)
+
+
+def compile_query(text: str, *, price_tier: str = "student") -> Query:
+    """Parse ``text`` into a :class:`Query`; an empty string matches everything."""
+    tokens = _tokenize(text)
+    if not tokens:
+        return Query(None, text=text, price_tier=price_tier)
+
+    parser = _Parser(tokens, price_tier)
+    root = parser.parse_or()
+    if parser.pos != len(tokens):
+        raise QueryError(f"Unexpected '{tokens[parser.pos][1]}' in query")
+    return Query(root, text=text, price_tier=price_tier)
+
+
+def _tokenize(text: str) -> List[tuple[str, str]]:
+    tokens: List[tuple[str, str]] = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None or match.end() == pos:
+            raise QueryError(f"Cannot parse query near '{text[pos:]}'")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "quoted":
+            kind = "word"
+        tokens.append((kind, value))
+    return tokens
+
+
+def _canonical(text: str) -> str:
+    """``text`` with its tokens separated by single spaces; quotes are kept."""
+    return " ".join(match.group(0).strip() for match in _TOKEN_RE.finditer(text.strip()))
+
+
+class _Parser:
+    def __init__(self, tokens: List[tuple[str, str]], price_tier: str) -> None:
+        self.tokens = tokens
+        self.pos = 0
+        self.price_tier = price_tier
+
+    def _peek(self) -> Optional[tuple[str, str]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self) -> tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise QueryError("Unexpected end of query")
+        self.pos += 1
+        return token
+
+    def _keyword(self, word: str) -> bool:
+        token = self._peek()
+        if token is not None and token[0] == "word" and token[1].lower() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def parse_or(self) -> Node:
+        operands = [self.parse_and()]
+        while self._keyword("or"):
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else BoolOp("or", tuple(operands))
+
+    def parse_and(self) -> Node:
+        operands = [self.parse_not()]
+        while self._keyword("and"):
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else BoolOp("and", tuple(operands))
+
+    def parse_not(self) -> Node:
+        if self._keyword("not"):
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self) -> Node:
+        kind, value = self._next()
+        if kind == "paren" and value == "(":
+            node = self.parse_or()
+            if self._next() != ("paren", ")"):
+                raise QueryError("Missing closing parenthesis")
+            return node
+        if kind != "word":
+            raise QueryError(f"Unexpected '{value}' in query")
+        return self._term(value.lower())
+
+    def _argument(self, name: str) -> tuple[str, str]:
+        kind, op = self._next()
+        if kind != "op":
+            raise QueryError(f"Expected an operator after '{name}'")
+        kind, value = self._next()
+        if kind != "word":
+            raise QueryError(f"Expected a value after '{name}{op}'")
+        return op, value
+
+    def _term(self, name: str) -> Term:
+        if name == "vegan":
+            return Term("dietary", lambda dietary: dietary.vegan, name)
+        if name in {"vegetarian", "veggie", "vegetarisch"}:
+            return Term("dietary", lambda dietary: dietary.vegetarian, name)
+
+        if name == "price":
+            op, value = self._argument(name)
+            compare = _COMPARISONS.get(op if op != ":" else "=")
+            try:
+                limit = float(value.replace("€", "").replace(",", "."))
+            except ValueError as exc:
+                raise QueryError(f"Invalid price '{value}'") from exc
+            tier = self.price_tier
+
+            def test_price(pricing: Any) -> bool:
+                price = getattr(pricing, tier)
+                return price is not None and compare(price, limit)
+
+            return Term("pricing", test_price, f"price{op}{value}")
+
+        if name in {"light", "traffic", "ampel"}:
+            op, value = self._equality(name)
+            wanted = LIGHT_ALIASES.get(value.casefold(), value.casefold())
+            negate = op == "!="
+            return Term(
+                "nutrition",
+                lambda nutrition: (
+                    (nutrition.traffic_light or "").casefold() == wanted
+                )
+                != negate,
+                f"light{op}{value}",
+            )
+
+        if name in {"allergen", "allergens"}:
+            op, value = self._equality(name)
+            needle = value.casefold()
+            names = ALLERGEN_ALIASES.get(needle, (needle,))
+            negate = op == "!="
+
+            def test_allergen(info: Any) -> bool:
+                present = any(
+                    code.casefold() == needle
+                    or (code.startswith(needle) and code[len(needle):].isalpha())
+                    for code in info.codes
+                ) or any(
+                    allergen.casefold().startswith(names) for allergen in info.allergens
+                )
+                return present != negate
+
+            return Term("allergens", test_allergen, f"allergen{op}{value}")
+
+        if name in {"category", "name"}:
+            op, value = self._equality(name)
+            needle = value.casefold()
+            negate = op == "!="
+            return Term(
+                name,
+                lambda text: (needle in text.casefold()) != negate,
+                f"{name}{op}{value}",
+            )
+
+        raise QueryError(f"Unknown query term '{name}'")
+
+    def _equality(self, name: str) -> tuple[str, str]:
+        op, value = self._argument(name)
+        if op not in {":", "=", "!="}:
+            raise QueryError(f"'{name}' only supports ':', '=' or '!='")
+        return op, value
@@ -0,0 +1,187 @@
+"""Host-level token bucket shared by all mensa processes on a machine.
+
+Each limited host has a small JSON state file in the cache directory that
+holds the bucket and wait-time metrics. Processes update it under an
+exclusive ``flock``, reserve a token (letting the balance go negative when
+the bucket is empty) and then sleep outside the lock until their reservation
+is due. Requests are therefore spaced at the configured rate in arrival
+order, and no process spins on the lock.
+
+Limits are configured per host as ``rate`` (requests per second) and
+``burst`` (bucket size). :data:`DEFAULT_LIMITS` can be overridden with the
+``MENSA_RATE_LIMITS`` environment variable, e.g.
+``MENSA_RATE_LIMITS="www.stw.berlin=1:3,localhost=off"``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Mapping, Optional
+
+from mensa import paths
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "MENSA_RATE_LIMITS"
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    """Sustained request rate (per second) and burst size for one host."""
+
+    rate: float
+    burst: int = 1
+
+
+DEFAULT_LIMITS: Mapping[str, HostLimit] = {
+    "www.stw.berlin": HostLimit(rate=2.0, burst=4),
+}
+
+
+@dataclass(slots=True)
+class BucketState:
+    """Persisted bucket plus cumulative wait metrics for one host."""
+
+    tokens: float
+    updated: float
+    requests: int = 0
+    waited: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+
+_thread_lock = threading.Lock()
+
+
+def parse_limits(spec: str) -> Dict[str, Optional[HostLimit]]:
+    """Parse ``host=rate[:burst]`` pairs; ``host=off`` disables limiting."""
+    limits: Dict[str, Optional[HostLimit]] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, value = item.partition("=")
+        host, value = host.strip().lower(), value.strip()
+        if not host or not value:
+            raise ValueError(f"Invalid rate limit '{item}', expected host=rate:burst")
+        if value == "off":
+            limits[host] = None
+            continue
+        rate, _, burst = value.partition(":")
+        limit = HostLimit(rate=float(rate), burst=int(burst or 1))
+        if limit.rate <= 0 or limit.burst < 1:
+            raise ValueError(f"Invalid rate limit '{item}'")
+        limits[host] = limit
+    return limits
+
+
+def configured_limits() -> Dict[str, HostLimit]:
+    limits: Dict[str, Optional[HostLimit]] = dict(DEFAULT_LIMITS)
+    spec = os.environ.get(ENV_VAR)
+    if spec:
+        try:
+            limits.update(parse_limits(spec))
+        except ValueError as exc:
+            logger.warning("Ignoring %s: %s", ENV_VAR, exc)
+    return {host: limit for host, limit in limits.items() if limit is not None}
+
+
+def limit_for(host: str) -> Optional[HostLimit]:
+    return configured_limits().get(host.lower())
+
+
+def _state_path(host: str) -> Path:
+    return paths.cache_dir("ratelimit") / f"{host.lower()}.json"
+
+
+@contextlib.contextmanager
+def _locked_state(host: str, limit: HostLimit) -> Iterator[BucketState]:
+    """Yield the host's bucket under an exclusive lock and persist changes."""
+    path = _state_path(host)
+    with _thread_lock if fcntl is None else contextlib.nullcontext():
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+", encoding="utf-8") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                raw = handle.read()
+                try:
+                    state = BucketState(**json.loads(raw)) if raw else None
+                except (TypeError, ValueError):
+                    logger.debug("Resetting corrupt rate limit state %s", path)
+                    state = None
+                if state is None:
+                    state = BucketState(tokens=float(limit.burst), updated=time.time())
+
+                yield state
+
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(asdict(state)))
+                handle.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def reserve(host: str, limit: HostLimit) -> float:
+    """Take one token for ``host`` and return how long to wait before using it."""
+    with _locked_state(host, limit) as state:
+        now = time.time()
+        elapsed = max(0.0, now - state.updated)
+        state.tokens = min(float(limit.burst), state.tokens + elapsed * limit.rate)
+        state.updated = now
+
+        state.tokens -= 1
+        wait = max(0.0, -state.tokens / limit.rate)
+
+        state.requests += 1
+        if wait > 0:
+            state.waited += 1
+            state.wait_total += wait
+            state.wait_max = max(state.wait_max, wait)
+    return wait
+
+
+def acquire(host: Optional[str]) -> float:
+    """Block until a request to ``host`` is allowed; return the time waited.
+
+    Hosts without a configured limit return immediately.
+    """
+    if not host:
+        return 0.0
+    limit = limit_for(host)
+    if limit is None:
+        return 0.0
+
+    try:
+        wait = reserve(host, limit)
+    except OSError as exc:
+        logger.warning("Rate limiter unavailable for %s: %s", host, exc)
+        return 0.0
+
+    if wait > 0:
+        logger.debug("Rate limit for %s: waiting %.3fs", host, wait)
+        time.sleep(wait)
+    return wait
+
+
+def metrics(host: str) -> Optional[BucketState]:
+    """Return the persisted state for ``host`` without modifying it."""
+    try:
+        raw = _state_path(host).read_text(encoding="utf-8")
+        return BucketState(**json.loads(raw)) if raw else None
+    except (OSError, TypeError, ValueError):
+        return None
@@ -0,0 +1,172 @@
+"""Fetch and parse menus for one or many sites."""
+
+from __future__ import annotations
+
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from mensa import http, singleflight
+from mensa.providers import BATCH_FETCHERS
+from mensa.providers.types import MealFilter, MensaSite, ParseResult
+from mensa.serialization import result_from_dict, result_to_dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+_flights = singleflight.Group()
+
+
+@dataclass(slots=True)
+class SiteOutcome:
+    """Result of scraping a single site; exactly one of result/error is set."""
+
+    site: MensaSite
+    result: Optional[ParseResult] = None
+    error: Optional[Exception] = None
+
+
+class UnsupportedDateError(ValueError):
+    """Raised when a provider cannot serve the menu of the requested day."""
+
+
+def today() -> str:
+    return datetime.date.today().isoformat()
+
+
+def supports_date(site: MensaSite, date: str) -> bool:
+    """Whether the provider of ``site`` can serve the menu of ``date``."""
+    return site.provider in BATCH_FETCHERS or date == today()
+
+
+def fetch_site(
+    site: MensaSite,
+    *,
+    date: Optional[str] = None,
+    where: Optional[MealFilter] = None,
+    coalesce: bool = True,
+) -> ParseResult:
+    """Fetch and parse the menu of a single site.
+
+    Providers with a batch fetcher serve any ``date``; STW pages only show
+    the current day, so other dates are rejected for them.
+
+    Concurrent calls for the same site, day and filter are coalesced, both
+    between threads and between processes (see :mod:`mensa.singleflight`);
+    coalesced callers receive the same :class:`ParseResult` and must not
+    modify it. Filters without a ``cache_key`` attribute (see
+    :class:`mensa.query.Query`) cannot be keyed and are never coalesced.
+    """
+    day = date or today()
+    query = "" if where is None else getattr(where, "cache_key", None)
+    if not coalesce or query is None:
+        return _fetch_site(site, day, where)
+
+    key = "\x1f".join((site.provider, site.url, day, query))
+
+    def fetch() -> ParseResult:
+        result, reused = singleflight.shared(
+            key,
+            lambda: _fetch_site(site, day, where),
+            dump=result_to_dict,
+            load=result_from_dict,
+        )
+        if reused:
+            logger.debug("Reusing %s menu fetched by another process", site.key)
+        return result
+
+    result, _ = _flights.do(key, fetch)
+    return result
+
+
+def _fetch_site(site: MensaSite, day: str, where: Optional[MealFilter]) -> ParseResult:
+    fetch_many = BATCH_FETCHERS.get(site.provider)
+    if fetch_many is not None:
+        result = fetch_many([site], [day], where=where)[(site.key, day)]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    if not supports_date(site, day):
+        raise UnsupportedDateError(
+            f"{site.provider} only serves today's menu, not {day}"
+        )
+
+    html = http.fetch_html(site.url)
+    result = site.parser(html, where=where) if where is not None else site.parser(html)
+    if result.menu_date is None:
+        result.menu_date = day
+    if result.source_url is None:
+        result.source_url = site.url
+    return result
+
+
+def _fetch_group(
+    provider: str, sites: List[MensaSite], where: Optional[MealFilter]
+) -> List[SiteOutcome]:
+    day = today()
+    try:
+        results = BATCH_FETCHERS[provider](sites, [day], where=where)
+    except Exception as exc:  # noqa: BLE001 - reported per site
+        logger.debug("Batch fetch for %s failed: %s", provider, exc)
+        return [SiteOutcome(site=site, error=exc) for site in sites]
+    outcomes = []
+    for site in sites:
+        result = results[(site.key, day)]
+        if isinstance(result, Exception):
+            logger.debug("Scraping %s failed: %s", site.key, result)
+            outcomes.append(SiteOutcome(site=site, error=result))
+        else:
+            outcomes.append(SiteOutcome(site=site, result=result))
+    return outcomes
+
+
+def iter_sites(
+    sites: Iterable[MensaSite],
+    *,
+    where: Optional[MealFilter] = None,
+    max_workers: int = DEFAULT_WORKERS,
+) -> Iterator[SiteOutcome]:
+    """Scrape sites concurrently, yielding outcomes in completion order.
+
+    Sites of providers with a batch fetcher are fetched as one task per
+    provider instead of one request per site. Closing the generator early
+    cancels the fetches that have not started yet and does not wait for the
+    running ones.
+    """
+    single: List[MensaSite] = []
+    batched: Dict[str, List[MensaSite]] = {}
+    for site in sites:
+        if site.provider in BATCH_FETCHERS:
+            batched.setdefault(site.provider, []).append(site)
+        else:
+            single.append(site)
+
+    tasks = len(single) + len(batched)
+    if not tasks:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, tasks))
+    try:
+        futures = {pool.submit(fetch_site, site, where=where): site for site in single}
+        groups = {
+            pool.submit(_fetch_group, provider, members, where): provider
+            for provider, members in batched.items()
+        }
+        for future in as_completed([*futures, *groups]):
+            if future in groups:
+                yield from future.result()
+                continue
+
+            site = futures[future]
+            try:
+                yield SiteOutcome(site=site, result=future.result())
+            except Exception as exc:  # noqa: BLE001 - reported per site
+                logger.debug("Scraping %s failed: %s", site.key, exc)
+                yield SiteOutcome(site=site, error=exc)
+    finally:
+        # Futures are only pending here if the caller stopped iterating early.
+        pool.shutdown(wait=False, cancel_futures=True)
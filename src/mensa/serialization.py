@@ -0,0 +1,42 @@
+"""JSON-compatible conversion of parse results."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any, Dict
+
+from mensa.models import AllergenInfo, DietaryInfo, Meal, NutritionInfo, Pricing
+from mensa.providers.types import ParseResult
+
+
+def meal_to_dict(meal: Meal) -> Dict[str, Any]:
+    return asdict(meal)
+
+
+def meal_from_dict(data: Dict[str, Any]) -> Meal:
+    return Meal(
+        category=data["category"],
+        name=data["name"],
+        pricing=Pricing(**data["pricing"]),
+        nutrition=NutritionInfo(**data["nutrition"]),
+        dietary=DietaryInfo(**data["dietary"]),
+        allergens=AllergenInfo(**data["allergens"]),
+    )
+
+
+def result_to_dict(result: ParseResult) -> Dict[str, Any]:
+    return {
+        "meals": [meal_to_dict(meal) for meal in result.meals],
+        "menu_date": result.menu_date,
+        "source_url": result.source_url,
+        "warnings": [*result.warnings],
+    }
+
+
+def result_from_dict(data: Dict[str, Any]) -> ParseResult:
+    return ParseResult(
+        meals=[meal_from_dict(meal) for meal in data["meals"]],
+        menu_date=data.get("menu_date"),
+        source_url=data.get("source_url"),
+        warnings=[*data.get("warnings", ())],
+    )
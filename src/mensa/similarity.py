@@ -0,0 +1,421 @@
+"""Near-duplicate detection for dish names with MinHash and LSH.
+
+Dish names are normalized (case, umlauts, punctuation, filler words such as
+"mit" or "dazu") and split into character shingles, so "Linsencurry mit
+Reis" and "Linsen-Curry, Reis" share almost all of them. Each distinct
+normalized name becomes a :class:`Dish` with a MinHash signature whose
+agreement rate estimates the Jaccard similarity of the shingle sets.
+
+Signatures are split into bands; dishes that agree on a whole band land in
+the same bucket. Lookups and clustering only compare dishes that share a
+bucket, so their cost grows with the number of near neighbours rather than
+with the size of the archive. With the default 24 bands of 4 rows, a pair
+at 0.6 similarity shares a bucket with 96% probability and one at 0.3 with
+less than 20%.
+
+The index is updated incrementally: menus are added as they are parsed, and
+:meth:`DishIndex.import_jsonl` only reads the part of a results file that
+was appended since the previous import. It is stored as plain JSON, so a
+tampered cache file can at worst produce wrong matches, never run code.
+"""
+
+from __future__ import annotations
+
+import base64
+import contextlib
+import hashlib
+import json
+import logging
+import operator
+import os
+import random
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from mensa import paths
+from mensa.providers.catalog import normalize
+from mensa.providers.types import ParseResult
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the stored layout or the hashing scheme changes.
+INDEX_VERSION = 2
+
+SHINGLE_SIZE = 3
+NUM_PERM = 96
+BANDS = 24
+DEFAULT_THRESHOLD = 0.6
+
+STOPWORDS = frozenset(
+    {
+        "a", "aus", "an", "auf", "dazu", "dem", "den", "der", "die", "das",
+        "im", "in", "mit", "nach", "oder", "sowie", "und", "vom", "von",
+        "zum", "zur",
+    }
+)
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_ROW_CACHE_SIZE = 200_000
+
+Occurrence = Tuple[str, str]
+
+
+def dish_key(name: str) -> str:
+    """Normalize a dish name for comparison; filler words are dropped."""
+    words = normalize(name).split()
+    kept = [word for word in words if word not in STOPWORDS]
+    return " ".join(kept or words)
+
+
+def shingles(key: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of a normalized name, ignoring word boundaries.
+
+    Spaces are removed first so that "linsencurry" and "linsen curry"
+    produce the same shingles.
+    """
+    text = key.replace(" ", "")
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[index : index + size] for index in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """``num_perm`` universal hash functions ``(a * x + b) mod p``.
+
+    Menus reuse a small vocabulary, so the hashed values of each shingle are
+    cached and a signature is an element-wise minimum over cached rows.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1) -> None:
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self.params = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+        self._rows: Dict[str, Tuple[int, ...]] = {}
+
+    def _row(self, item: str) -> Tuple[int, ...]:
+        row = self._rows.get(item)
+        if row is None:
+            value = int.from_bytes(
+                hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            row = tuple(((a * value + b) % _PRIME) & _MAX_HASH for a, b in self.params)
+            if len(self._rows) < _ROW_CACHE_SIZE:
+                self._rows[item] = row
+        return row
+
+    def signature(self, items: Iterable[str]) -> Tuple[int, ...]:
+        rows = [self._row(item) for item in items]
+        if not rows:
+            return (_MAX_HASH,) * self.num_perm
+        return tuple(map(min, zip(*rows)))
+
+
+def estimate(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(map(operator.eq, first, second)) / len(first)
+
+
+@dataclass(slots=True)
+class Dish:
+    """A distinct normalized dish name and where it was served."""
+
+    key: str
+    name: str
+    signature: Tuple[int, ...]
+    occurrences: Set[Occurrence] = field(default_factory=set)
+
+    @property
+    def sites(self) -> Set[str]:
+        return {site for _, site in self.occurrences}
+
+    @property
+    def dates(self) -> Set[str]:
+        return {date for date, _ in self.occurrences}
+
+
+@dataclass(slots=True)
+class DishCluster:
+    """A dish and the spelling variants grouped with it."""
+
+    dishes: List[Dish]
+
+    @property
+    def name(self) -> str:
+        return self.dishes[0].name
+
+    @property
+    def occurrences(self) -> Set[Occurrence]:
+        return set().union(*(dish.occurrences for dish in self.dishes))
+
+    @property
+    def sites(self) -> Set[str]:
+        return {site for _, site in self.occurrences}
+
+    @property
+    def days(self) -> int:
+        return len({date for date, _ in self.occurrences})
+
+
+class DishIndex:
+    """Incrementally built LSH index over dish names."""
+
+    def __init__(self, *, num_perm: int = NUM_PERM, bands: int = BANDS) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.version = INDEX_VERSION
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.dishes: List[Dish] = []
+        self.by_key: Dict[str, int] = {}
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        # Bytes of each imported results file that were already consumed.
+        self.offsets: Dict[str, int] = {}
+        # Set by changes since loading; :func:`updating` only saves then.
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.dishes)
+
+    def _bands(self, signature: Tuple[int, ...]) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        for band in range(self.bands):
+            yield band, signature[band * self.rows : (band + 1) * self.rows]
+
+    def _signature(self, key: str) -> Tuple[int, ...]:
+        return self.hasher.signature(shingles(key))
+
+    def _insert(self, dish: Dish) -> int:
+        index = len(self.dishes)
+        self.dishes.append(dish)
+        self.by_key[dish.key] = index
+        for bucket in self._bands(dish.signature):
+            self.buckets[bucket].append(index)
+        return index
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain JSON-compatible form of the index.
+
+        Signatures are concatenated into one base64 array; buckets are not
+        stored since they follow from the signatures.
+        """
+        signatures = array("I")
+        for dish in self.dishes:
+            signatures.extend(dish.signature)
+        return {
+            "version": self.version,
+            "num_perm": self.hasher.num_perm,
+            "seed": self.hasher.seed,
+            "bands": self.bands,
+            "dishes": [
+                [dish.key, dish.name, sorted(dish.occurrences)] for dish in self.dishes
+            ],
+            "signatures": base64.b64encode(signatures.tobytes()).decode("ascii"),
+            "offsets": self.offsets,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DishIndex":
+        index = cls(num_perm=data["num_perm"], bands=data["bands"])
+        index.hasher = MinHasher(data["num_perm"], seed=data["seed"])
+        signatures = array("I")
+        signatures.frombytes(base64.b64decode(data["signatures"], validate=True))
+        width = index.hasher.num_perm
+        if len(signatures) != width * len(data["dishes"]):
+            raise ValueError("Inconsistent dish signatures")
+
+        for position, (key, name, occurrences) in enumerate(data["dishes"]):
+            if key in index.by_key:
+                raise ValueError(f"Duplicate dish '{key}'")
+            index._insert(
+                Dish(
+                    key=key,
+                    name=name,
+                    signature=tuple(signatures[position * width : (position + 1) * width]),
+                    occurrences={(date, site) for date, site in occurrences},
+                )
+            )
+        index.offsets = {str(source): int(offset) for source, offset in data["offsets"].items()}
+        return index
+
+    def add(self, name: str, date: str, site_key: str) -> Optional[Dish]:
+        """Record that ``name`` was served at ``site_key`` on ``date``."""
+        key = dish_key(name)
+        if not key:
+            return None
+
+        index = self.by_key.get(key)
+        if index is None:
+            index = self._insert(
+                Dish(key=key, name=name.strip(), signature=self._signature(key))
+            )
+            self.dirty = True
+
+        dish = self.dishes[index]
+        if (date, site_key) not in dish.occurrences:
+            dish.occurrences.add((date, site_key))
+            self.dirty = True
+        return dish
+
+    def add_result(self, site_key: str, result: ParseResult, date: Optional[str] = None) -> None:
+        day = date or result.menu_date
+        if day is None:
+            raise ValueError("A date is required for results without menu_date")
+        for meal in result.meals:
+            self.add(meal.name, day, site_key)
+
+    def import_jsonl(self, path: Path) -> int:
+        """Add results appended to a ``mensa jobs`` results file since last time.
+
+        Returns the number of records read. A file that shrank is re-read from
+        the start; occurrences are sets, so records seen before are harmless.
+        """
+        source = str(path.resolve())
+        offset = self.offsets.get(source, 0)
+        try:
+            if path.stat().st_size < offset:
+                offset = 0
+            handle = path.open("rb")
+        except FileNotFoundError:
+            return 0
+
+        records = 0
+        with handle:
+            handle.seek(offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break  # a worker is still writing this record
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                    meals = record["result"]["meals"]
+                    date, site_key = record["date"], record["site"]
+                except (ValueError, KeyError, TypeError) as exc:
+                    logger.warning("Skipping malformed record in %s: %s", path, exc)
+                    continue
+                for meal in meals:
+                    self.add(meal.get("name") or "", date, site_key)
+                records += 1
+
+        if self.offsets.get(source) != offset:
+            self.offsets[source] = offset
+            self.dirty = True
+        return records
+
+    def _candidates(self, signature: Tuple[int, ...]) -> Set[int]:
+        found: Set[int] = set()
+        for bucket in self._bands(signature):
+            found.update(self.buckets.get(bucket, ()))
+        return found
+
+    def similar(
+        self, name: str, *, threshold: float = DEFAULT_THRESHOLD, limit: Optional[int] = None
+    ) -> List[Tuple[float, Dish]]:
+        """Dishes whose estimated similarity to ``name`` reaches ``threshold``."""
+        signature = self._signature(dish_key(name))
+        scored = [
+            (score, self.dishes[index])
+            for index in self._candidates(signature)
+            if (score := estimate(signature, self.dishes[index].signature)) >= threshold
+        ]
+        scored.sort(key=lambda item: (-item[0], -len(item[1].occurrences), item[1].key))
+        return scored[:limit] if limit is not None else scored
+
+    def clusters(self, *, threshold: float = DEFAULT_THRESHOLD) -> List[DishCluster]:
+        """Group near-duplicate dishes around the most frequently served ones.
+
+        Dishes are visited by descending number of occurrences; each dish not
+        yet assigned starts a cluster and absorbs its unassigned LSH
+        neighbours above ``threshold``. Comparing against the cluster's first
+        dish (rather than linking transitively) keeps chains of small edits
+        from merging unrelated dishes. Clusters are ordered by the number of
+        days they were served on.
+        """
+        order = sorted(
+            range(len(self.dishes)),
+            key=lambda index: (-len(self.dishes[index].occurrences), self.dishes[index].key),
+        )
+        assigned: Set[int] = set()
+        result: List[DishCluster] = []
+        for leader in order:
+            if leader in assigned:
+                continue
+            assigned.add(leader)
+            signature = self.dishes[leader].signature
+            members = [self.dishes[leader]]
+            for index in sorted(self._candidates(signature) - assigned):
+                if estimate(signature, self.dishes[index].signature) >= threshold:
+                    assigned.add(index)
+                    members.append(self.dishes[index])
+            result.append(DishCluster(dishes=members))
+
+        result.sort(key=lambda cluster: (-cluster.days, -len(cluster.sites), cluster.name))
+        return result
+
+
+def default_path() -> Path:
+    return paths.cache_dir("dishes") / "index.json"
+
+
+def load_index(path: Path) -> DishIndex:
+    """Load a stored index; a missing, broken or outdated one starts empty."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return DishIndex()
+    except Exception as exc:  # noqa: BLE001 - a broken index is rebuilt
+        logger.warning("Ignoring unreadable dish index %s: %s", path, exc)
+        return DishIndex()
+
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+        logger.info("Dish index %s is outdated; starting over", path)
+        return DishIndex()
+    try:
+        return DishIndex.from_dict(data)
+    except Exception as exc:  # noqa: BLE001 - a broken index is rebuilt
+        logger.warning("Ignoring unreadable dish index %s: %s", path, exc)
+        return DishIndex()
+
+
+def save_index(index: DishIndex, path: Path) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(
+        json.dumps(index.to_dict(), ensure_ascii=False, separators=(",", ":")),
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def updating(path: Optional[Path] = None) -> Iterator[DishIndex]:
+    """Load the index, yield it for changes and save it, under a file lock.
+
+    The lock keeps concurrent ``mensa`` processes from losing each other's
+    additions. The index is only written back if it changed. Keep the block
+    short: other processes wait on the lock for as long as it runs.
+    """
+    path = path or default_path()
+    with open(path.with_suffix(".lock"), "a+b") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            index = load_index(path)
+            index.dirty = False
+            yield index
+            if index.dirty:
+                save_index(index, path)
+                index.dirty = False
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
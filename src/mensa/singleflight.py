@@ -0,0 +1,180 @@
+"""Coalesce concurrent work on the same key, within and across processes.
+
+:class:`Group` lets threads of one process share a single in-flight call per
+key: the first caller runs it, later callers block and receive the same
+result (or exception).
+
+:func:`shared` does the same across processes with a per-key lock file in
+the cache directory. The leader holds an exclusive ``flock`` while it works
+and stores the serialized result next to the lock; processes that queued
+on the lock reuse it if it was written less than ``window`` seconds ago.
+Errors are not shared between processes: when no fresh result exists, the
+next process in line simply does the work itself.
+
+The window defaults to :data:`DEFAULT_WINDOW` and can be changed with the
+``MENSA_SINGLEFLIGHT_WINDOW`` environment variable; ``0`` disables
+cross-process sharing.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+from mensa import paths
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+ENV_VAR = "MENSA_SINGLEFLIGHT_WINDOW"
+DEFAULT_WINDOW = 10.0
+LOCK_TIMEOUT = 60.0
+_POLL_INTERVAL = 0.02
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class Group:
+    """In-process single-flight: one running call per key."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call[Any]] = {}
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Run ``fn`` unless a call for ``key`` is in flight.
+
+        Returns the result and whether it was shared with another caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+def configured_window() -> float:
+    value = os.environ.get(ENV_VAR)
+    if not value:
+        return DEFAULT_WINDOW
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        logger.warning("Ignoring %s=%r, expected seconds", ENV_VAR, value)
+        return DEFAULT_WINDOW
+
+
+def _lock(handle: Any, timeout: float) -> bool:
+    """Take an exclusive lock on ``handle``, giving up after ``timeout``."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(_POLL_INTERVAL)
+
+
+def _read(path: str, key: str, window: float) -> Optional[Any]:
+    try:
+        with open(path, encoding="utf-8") as handle:
+            data = json.load(handle)
+    except (OSError, ValueError):
+        return None
+    if data.get("key") != key or time.time() - data.get("written", 0.0) >= window:
+        return None
+    return data.get("value")
+
+
+def _write(path: str, key: str, value: Any) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        json.dump({"key": key, "written": time.time(), "value": value}, handle)
+    os.replace(tmp, path)
+
+
+def shared(
+    key: str,
+    fn: Callable[[], T],
+    *,
+    dump: Callable[[T], Any],
+    load: Callable[[Any], T],
+    window: Optional[float] = None,
+    timeout: float = LOCK_TIMEOUT,
+) -> Tuple[T, bool]:
+    """Run ``fn`` once per ``window`` across processes.
+
+    ``dump``/``load`` convert the result to and from JSON-compatible data.
+    Returns the result and whether it came from another process. When the
+    lock is unavailable or not acquired within ``timeout``, ``fn`` runs
+    without coordination.
+    """
+    window = configured_window() if window is None else window
+    if fcntl is None or window <= 0:
+        return fn(), False
+
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+    directory = paths.cache_dir("singleflight")
+    lock_path = os.path.join(directory, f"{digest}.lock")
+    result_path = os.path.join(directory, f"{digest}.json")
+
+    try:
+        handle = open(lock_path, "a+b")
+    except OSError as exc:
+        logger.debug("Single-flight lock unavailable for %s: %s", key, exc)
+        return fn(), False
+
+    with handle:
+        if not _lock(handle, timeout):
+            logger.debug("Timed out waiting for single-flight lock on %s", key)
+            return fn(), False
+        try:
+            cached = _read(result_path, key, window)
+            if cached is not None:
+                return load(cached), True
+
+            value = fn()
+            try:
+                _write(result_path, key, dump(value))
+            except OSError as exc:
+                logger.debug("Could not store single-flight result for %s: %s", key, exc)
+            return value, False
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,253 @@
+"""Local HTTP stand-in for upstream menu sites.
+
+The server answers on ``127.0.0.1`` with fixture documents registered per
+path (or produced by route handlers that see the query string) and can
+inject latency, jitter, errors and throttling. It supports
+``ETag``/``If-None-Match`` so conditional requests can be exercised.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from mensa.http import normalize_url
+from mensa.providers.types import MensaSite
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """Fault and latency injection settings for :class:`StandInServer`."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    etag: bool = True
+    throttle_rate: float = 0.0
+    throttle_burst: int = 1
+    seed: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Document:
+    body: bytes
+    content_type: str = "text/html; charset=utf-8"
+
+    @property
+    def etag(self) -> str:
+        return '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+
+Route = Callable[[Dict[str, List[str]]], Optional[Document]]
+
+
+@dataclass
+class ServerStats:
+    requests: int = 0
+    statuses: Counter = field(default_factory=Counter)
+
+
+def render_menu_page(
+    *, groups: int = 4, meals_per_group: int = 6, seed: int = 0
+) -> str:
+    """Build a deterministic page in the STW Berlin speiseplan markup."""
+    rng = random.Random(seed)
+    dishes = (
+        "Linsencurry mit Reis", "Gemüselasagne", "Hähnchenbrust mit Kartoffeln",
+        "Falafel mit Hummus", "Spaghetti Bolognese", "Tofu-Bowl mit Erdnusssauce",
+        "Seelachsfilet mit Dillsauce", "Kartoffelsuppe", "Chili sin Carne",
+    )
+    categories = ("Vorspeisen", "Salate", "Essen", "Beilagen", "Desserts", "Aktionen")
+    icons = ("1.png", "15.png", "18.png", "38.png", "41.png", "43.png")
+    lights = ("ampel_gruen", "ampel_gelb", "ampel_rot")
+    codes = ("21a", "22", "23", "24", "25", "26b", "28", "30", "32", "8", "2")
+
+    parts = ['<html><body><div id="speiseplan">']
+    for group in range(groups):
+        parts.append('<div class="splGroupWrapper">')
+        parts.append(f'<div class="splGroup">{categories[group % len(categories)]}</div>')
+        for _ in range(meals_per_group):
+            student = rng.randint(90, 550) / 100
+            kennz = ",".join(rng.sample(codes, rng.randint(0, 4)))
+            parts.append(f'<div class="splMeal" data-kennz="{kennz}">')
+            parts.append('<div class="col-xs-6"><span class="bold">')
+            parts.append(f"{rng.choice(dishes)}</span></div>")
+            parts.append(
+                f'<img class="splIcon" src="/vendor/infomax/mensen/icons/{rng.choice(icons)}">'
+            )
+            parts.append(
+                f'<img class="splIcon" src="/vendor/infomax/mensen/icons/{rng.choice(lights)}.png">'
+            )
+            prices = "/".join(
+                f"{student * factor:.2f}".replace(".", ",") for factor in (1, 1.6, 2.1)
+            )
+            parts.append(f'<div class="col-xs-12 col-md-3 text-right">€ {prices}</div>')
+            parts.append("</div>")
+        parts.append("</div>")
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+def site_path(url: str) -> str:
+    """Path (with query) that ``fetch_html`` will request for ``url``."""
+    parts = urlsplit(normalize_url(url))
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class StandInServer:
+    """Threaded HTTP server serving registered documents with injected faults.
+
+    Use as a context manager; ``base_url`` is available once started.
+    """
+
+    def __init__(self, config: ServerConfig = ServerConfig()) -> None:
+        self.config = config
+        self.documents: Dict[str, Document] = {}
+        self.routes: Dict[str, Route] = {}
+        self.stats = ServerStats()
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+        self._tokens = float(config.throttle_burst)
+        self._refilled = time.monotonic()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, path: str, body: str, content_type: str = "text/html; charset=utf-8") -> None:
+        self.documents[path] = Document(body.encode("utf-8"), content_type)
+
+    def add_route(self, path: str, route: Route) -> None:
+        """Answer requests for ``path`` (any query) with ``route(query)``.
+
+        Returning ``None`` from the route produces a 404.
+        """
+        self.routes[path] = route
+
+    def resolve(self, target: str) -> Optional[Document]:
+        document = self.documents.get(target)
+        if document is not None:
+            return document
+        parts = urlsplit(target)
+        route = self.routes.get(parts.path)
+        return None if route is None else route(parse_qs(parts.query))
+
+    def add_sites(self, sites: Iterable[MensaSite], body: Optional[str] = None) -> None:
+        """Serve a menu page at the path of every site URL."""
+        page = body if body is not None else render_menu_page()
+        for site in sites:
+            self.add(site_path(site.url), page)
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("Stand-in server is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def local_url(self, url: str) -> str:
+        """Rewrite an upstream URL to point at this server."""
+        parts = urlsplit(url)
+        return self.base_url + parts.path + (f"?{parts.query}" if parts.query else "")
+
+    def start(self) -> "StandInServer":
+        handler = type("Handler", (_Handler,), {"standin": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _decide(self) -> Tuple[float, Optional[int]]:
+        """Return the delay and an injected status code (if any)."""
+        config = self.config
+        with self._lock:
+            delay = config.latency
+            if config.jitter:
+                delay += self._rng.uniform(-config.jitter, config.jitter)
+
+            if config.throttle_rate > 0:
+                now = time.monotonic()
+                self._tokens = min(
+                    float(config.throttle_burst),
+                    self._tokens + (now - self._refilled) * config.throttle_rate,
+                )
+                self._refilled = now
+                if self._tokens < 1:
+                    return max(0.0, delay), 429
+                self._tokens -= 1
+
+            if config.error_rate and self._rng.random() < config.error_rate:
+                return max(0.0, delay), 503
+        return max(0.0, delay), None
+
+    def _record(self, status: int) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.statuses[status] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    standin: StandInServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        server = self.standin
+        delay, status = server._decide()
+        if delay:
+            time.sleep(delay)
+
+        document = server.resolve(self.path) if status is None else None
+        if status is None and document is None:
+            status = 404
+
+        if status is not None:
+            self._send(status, b"", "text/plain", extra={"Retry-After": "1"} if status == 429 else None)
+            return
+
+        headers = {}
+        if server.config.etag:
+            headers["ETag"] = document.etag
+            if self.headers.get("If-None-Match") == document.etag:
+                self._send(304, b"", document.content_type, extra=headers)
+                return
+
+        self._send(200, document.body, document.content_type, extra=headers)
+
+    def _send(
+        self,
+        status: int,
+        body: bytes,
+        content_type: str,
+        *,
+        extra: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.standin._record(status)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
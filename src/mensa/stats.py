@@ -0,0 +1,221 @@
+"""Single-pass, mergeable menu statistics with persisted daily rollups."""
+
+from __future__ import annotations
+
+import contextlib
+import datetime
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from mensa.models import Meal
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+PRICE_TIERS = ("student", "employee", "guest")
+
+
+@dataclass(slots=True)
+class PriceSketch:
+    """Fixed-resolution histogram of prices in cents.
+
+    Memory is bounded by the number of distinct cent values rather than the
+    number of observations, sketches merge by adding counts, and quantiles are
+    exact at cent resolution.
+    """
+
+    bins: Counter = field(default_factory=Counter)
+    count: int = 0
+
+    def add(self, price: float) -> None:
+        self.bins[round(price * 100)] += 1
+        self.count += 1
+
+    def merge(self, other: "PriceSketch") -> None:
+        self.bins.update(other.bins)
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for cents in sorted(self.bins):
+            seen += self.bins[cents]
+            if seen > rank:
+                return cents / 100
+        return max(self.bins) / 100
+
+    def mean(self) -> Optional[float]:
+        if not self.count:
+            return None
+        return sum(cents * n for cents, n in self.bins.items()) / self.count / 100
+
+    def to_dict(self) -> Dict[str, int]:
+        return {str(cents): n for cents, n in self.bins.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, int]) -> "PriceSketch":
+        bins = Counter({int(cents): n for cents, n in data.items()})
+        return cls(bins=bins, count=sum(bins.values()))
+
+
+@dataclass(slots=True)
+class MealStats:
+    """Aggregates updated once per meal; instances can be merged."""
+
+    total: int = 0
+    vegetarian: int = 0
+    vegan: int = 0
+    categories: Counter = field(default_factory=Counter)
+    traffic_lights: Counter = field(default_factory=Counter)
+    allergens: Counter = field(default_factory=Counter)
+    prices: Dict[str, PriceSketch] = field(
+        default_factory=lambda: {tier: PriceSketch() for tier in PRICE_TIERS}
+    )
+
+    @classmethod
+    def from_meals(cls, meals: Iterable[Meal]) -> "MealStats":
+        stats = cls()
+        for meal in meals:
+            stats.add(meal)
+        return stats
+
+    def add(self, meal: Meal) -> None:
+        self.total += 1
+        self.vegetarian += meal.dietary.vegetarian
+        self.vegan += meal.dietary.vegan
+        self.categories[meal.category] += 1
+        self.traffic_lights[meal.nutrition.traffic_light or "Unknown"] += 1
+        self.allergens.update(meal.allergens.allergens)
+
+        pricing = meal.pricing
+        for tier in PRICE_TIERS:
+            price = getattr(pricing, tier)
+            if price is not None:
+                self.prices[tier].add(price)
+
+    def merge(self, other: "MealStats") -> None:
+        self.total += other.total
+        self.vegetarian += other.vegetarian
+        self.vegan += other.vegan
+        self.categories.update(other.categories)
+        self.traffic_lights.update(other.traffic_lights)
+        self.allergens.update(other.allergens)
+        for tier in PRICE_TIERS:
+            self.prices[tier].merge(other.prices[tier])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "vegetarian": self.vegetarian,
+            "vegan": self.vegan,
+            "categories": dict(self.categories),
+            "traffic_lights": dict(self.traffic_lights),
+            "allergens": dict(self.allergens),
+            "prices": {tier: self.prices[tier].to_dict() for tier in PRICE_TIERS},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MealStats":
+        prices = data.get("prices", {})
+        return cls(
+            total=data.get("total", 0),
+            vegetarian=data.get("vegetarian", 0),
+            vegan=data.get("vegan", 0),
+            categories=Counter(data.get("categories", {})),
+            traffic_lights=Counter(data.get("traffic_lights", {})),
+            allergens=Counter(data.get("allergens", {})),
+            prices={
+                tier: PriceSketch.from_dict(prices.get(tier, {}))
+                for tier in PRICE_TIERS
+            },
+        )
+
+
+class RollupStore:
+    """Per-day JSON files holding one ``MealStats`` rollup per site.
+
+    Reports over a date range only read one small file per day, so a long
+    horizon never rescans raw menu data.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _path(self, date: str) -> Path:
+        return self.root / f"{date}.json"
+
+    def _read(self, date: str) -> Dict[str, Any]:
+        path = self._path(date)
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable rollup %s: %s", path, exc)
+            return {}
+
+    @contextlib.contextmanager
+    def _locked(self, date: str) -> Iterator[None]:
+        """Serialize read-modify-write of a day's file across processes."""
+        with self._path(date).with_suffix(".lock").open("a+b") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def save(self, date: str, site_key: str, stats: MealStats) -> None:
+        """Store (or replace) the rollup of a site for a given day.
+
+        Concurrent runs for other sites of the same day keep their rollups:
+        the day's file is merged under an exclusive lock.
+        """
+        path = self._path(date)
+        with self._locked(date):
+            data = self._read(date)
+            data[site_key] = stats.to_dict()
+
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+
+    def load(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        site_keys: Optional[Iterable[str]] = None,
+    ) -> tuple[MealStats, int]:
+        """Merge rollups between start and end (inclusive).
+
+        Returns the merged statistics and the number of days with data.
+        """
+        wanted = set(site_keys) if site_keys is not None else None
+        merged = MealStats()
+        days = 0
+
+        day = start
+        while day <= end:
+            data = self._read(day.isoformat())
+            found = False
+            for key, raw in data.items():
+                if wanted is None or key in wanted:
+                    merged.merge(MealStats.from_dict(raw))
+                    found = True
+            days += found
+            day += datetime.timedelta(days=1)
+
+        return merged, days
@@ -0,0 +1,217 @@
+"""One-line menu output for shell prompts and status bars.
+
+Rendered lines are cached per day and command line (which carries the site
+and options). A cache hit only needs ``os``, ``sys``, ``time`` and ``zlib``:
+this module must not import bs4, requests, rich, typer or even argparse at
+module level, and neither may anything it imports eagerly.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+import zlib
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from mensa import paths
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import argparse
+
+    from mensa.models import Meal
+
+DEFAULT_MENSA = "hu_süd"
+DEFAULT_TTL = 1800.0
+DEFAULT_LIMIT = 3
+DEFAULT_WIDTH = 120
+SEPARATOR = " · "
+
+
+def _parser() -> "argparse.ArgumentParser":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="mensa status", description="Print today's menu on a single line."
+    )
+    parser.add_argument("-m", "--mensa", default=DEFAULT_MENSA, help="Mensa key")
+    parser.add_argument(
+        "--price-tier",
+        default="student",
+        choices=("student", "employee", "guest"),
+        help="Price tier to show",
+    )
+    parser.add_argument(
+        "-n", "--limit", type=int, default=DEFAULT_LIMIT, help="Number of dishes"
+    )
+    parser.add_argument(
+        "-w", "--where", default="", help="Filter dishes, as in 'mensa find'"
+    )
+    parser.add_argument(
+        "--width", type=int, default=DEFAULT_WIDTH, help="Maximum line length"
+    )
+    parser.add_argument(
+        "--no-prices", dest="prices", action="store_false", help="Hide prices"
+    )
+    parser.add_argument(
+        "--ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help="Seconds before a cached line is refreshed",
+    )
+    return parser
+
+
+def _ttl(argv: Sequence[str]) -> float:
+    """Read ``--ttl`` without argparse; invalid values fall back to a miss."""
+    value = None
+    for index, arg in enumerate(argv):
+        if arg == "--ttl" and index + 1 < len(argv):
+            value = argv[index + 1]
+        elif arg.startswith("--ttl="):
+            value = arg.partition("=")[2]
+    try:
+        return DEFAULT_TTL if value is None else float(value)
+    except ValueError:
+        return 0.0
+
+
+def cache_file(argv: Sequence[str]) -> tuple[str, str]:
+    """Return the cache file for ``argv`` today and the key stored in it.
+
+    The raw argument list is the key, so a hit needs no option parsing.
+    The key is written as the first line and compared on read, which makes
+    the short CRC in the file name safe against collisions.
+    """
+    key = "\x1f".join(argv)
+    name = f"{time.strftime('%Y-%m-%d')}-{zlib.crc32(key.encode('utf-8')):08x}.txt"
+    return os.path.join(paths.cache_root(), "status", name), key
+
+
+def read_cached(argv: Sequence[str], max_age: float) -> Optional[str]:
+    path, key = cache_file(argv)
+    try:
+        if time.time() - os.stat(path).st_mtime >= max_age:
+            return None
+        with open(path, encoding="utf-8") as handle:
+            stored_key, _, line = handle.read().partition("\n")
+    except OSError:
+        return None
+    return line if stored_key == key else None
+
+
+def render_line(
+    site_name: str,
+    meals: Sequence["Meal"],
+    *,
+    price_tier: str = "student",
+    limit: int = DEFAULT_LIMIT,
+    prices: bool = True,
+    width: int = DEFAULT_WIDTH,
+) -> str:
+    """Format up to ``limit`` meals as ``Name: dish €1.23 · dish €2.34``."""
+    items: List[str] = []
+    for meal in meals[:limit]:
+        price = getattr(meal.pricing, price_tier)
+        if prices and price is not None:
+            items.append(f"{meal.name} €{price:.2f}")
+        else:
+            items.append(meal.name)
+
+    if not items:
+        line = f"{site_name}: no dishes"
+    else:
+        line = f"{site_name}: {SEPARATOR.join(items)}"
+        if len(meals) > limit:
+            line += f" (+{len(meals) - limit})"
+
+    if width > 0 and len(line) > width:
+        line = line[: max(1, width - 1)] + "…"
+    return line
+
+
+def _render(options: "argparse.Namespace") -> str:
+    """Scrape and render; this is the only path that loads the parser stack."""
+    from mensa import scraper
+    from mensa.providers import CATALOG, SITES
+    from mensa.query import compile_query
+
+    record = CATALOG.resolve(options.mensa)
+    if record is None:
+        raise LookupError(f"unknown mensa '{options.mensa}'")
+    site = SITES[record.key]
+
+    where = compile_query(options.where, price_tier=options.price_tier)
+    result = scraper.fetch_site(site, where=where if options.where else None)
+    meals = [meal for meal in result.meals if where.matches(meal)]
+
+    name = site.name.removeprefix("Mensa ").strip() or site.name
+    return render_line(
+        name,
+        meals,
+        price_tier=options.price_tier,
+        limit=options.limit,
+        prices=options.prices,
+        width=options.width,
+    )
+
+
+def _store(argv: Sequence[str], line: str) -> None:
+    path, key = cache_file(argv)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    today = os.path.basename(path)[:10]
+    for name in os.listdir(directory):
+        if not name.startswith(today):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as handle:
+        handle.write(f"{key}\n{line}")
+    os.replace(tmp, path)
+
+
+def status_line(argv: Sequence[str]) -> str:
+    """Return the cached line if fresh, otherwise render and cache it.
+
+    When rendering fails, a stale line from the same day is preferred over an
+    error message.
+    """
+    line = read_cached(argv, _ttl(argv))
+    if line is not None:
+        return line
+
+    options = _parser().parse_args(argv)
+    try:
+        line = _render(options)
+    except Exception:
+        stale = read_cached(argv, float("inf"))
+        if stale is not None:
+            return stale
+        raise
+
+    _store(argv, line)
+    return line
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    argv = [*(sys.argv[1:] if argv is None else argv)]
+    if "-h" in argv or "--help" in argv:
+        _parser().parse_args(argv)
+
+    try:
+        line = status_line(argv)
+    except Exception as exc:  # noqa: BLE001 - prompts want a short message
+        message = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+        print(f"mensa: {message[:100]}", file=sys.stderr)
+        return 1
+    print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())